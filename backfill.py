@@ -0,0 +1,78 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CATCHUP_WORKERS = 4
+CATCHUP_BATCH = 20
+CATCHUP_MAX_AGE = 30 * 24 * 60 * 60
+
+
+class Prefetched:
+    """Отдаёт заранее полученные ответы API вместо нового запроса."""
+
+    def __init__(self, results):
+        self.results = results
+
+    def __call__(self, subscriber, current_timestamp):
+        """Возвращает ответ подписчика или поднимает полученную ошибку."""
+        response, error = self.results[subscriber.key]
+        if error is not None:
+            raise error
+        return response
+
+
+def prefetch(fetch, subscriber, current_timestamp):
+    """Запрашивает API, возвращая пару (ответ, ошибка)."""
+    try:
+        return fetch(subscriber, current_timestamp), None
+    except Exception as error:
+        return None, error
+
+
+def catch_up(subscribers, store, fetch, poll, flush, lag,
+             max_age=CATCHUP_MAX_AGE, workers=CATCHUP_WORKERS,
+             batch_size=CATCHUP_BATCH, clock=time.time, beat=None):
+    """Догоняет подписчиков, чей курсор отстал больше чем на `lag` секунд.
+
+    API принимает только нижнюю границу `from_date`, поэтому один
+    запрос от сохранённого курсора возвращает всё пропущенное.
+    Курсор не уходит в прошлое дальше `max_age`. Подписчики
+    обрабатываются пачками по `batch_size`: запросы пачки идут
+    параллельно не более чем в `workers` потоков, затем ответы
+    проходят обычную обработку `poll(fetch, subscriber)`, состояние
+    сохраняется и очередь отправки сбрасывается через `flush()`.
+    `beat()` вызывается после каждого ответа и каждой обработки.
+    Возвращает число догнанных подписчиков.
+    """
+    beat = beat or (lambda: None)
+    now = clock()
+    behind = [
+        subscriber for subscriber in subscribers
+        if now - store.cursor(subscriber.key) > lag
+    ]
+    if not behind:
+        return 0
+    logging.info(f'Догоняем {len(behind)} подписчиков после простоя')
+    for subscriber in behind:
+        store.advance(subscriber.key, max(
+            store.cursor(subscriber.key), int(now - max_age)
+        ))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(behind), batch_size):
+            batch = behind[start:start + batch_size]
+            futures = [
+                executor.submit(prefetch, fetch, subscriber,
+                                store.cursor(subscriber.key))
+                for subscriber in batch
+            ]
+            results = {}
+            for subscriber, future in zip(batch, futures):
+                results[subscriber.key] = future.result()
+                beat()
+            prefetched = Prefetched(results)
+            for subscriber in batch:
+                poll(prefetched, subscriber)
+                beat()
+            store.save()
+            flush()
+    return len(behind)
@@ -0,0 +1,150 @@
+import argparse
+import io
+import logging
+import random
+import timeit
+
+import exceptions
+import homework
+from digest import DigestBuffer
+from outbox import Outbox
+from subscribers import Subscriber
+
+
+def make_responses(count, size, seed=0):
+    """Собирает `count` ответов API по `size` работ в каждом."""
+    rng = random.Random(seed)
+    statuses = list(homework.HOMEWORK_STATUSES)
+    return [
+        {
+            'homeworks': [
+                {
+                    'id': number,
+                    'homework_name': f'hw{number}',
+                    'status': rng.choice(statuses),
+                    'reviewer_comment': '',
+                    'date_updated': '2020-02-13T14:40:57Z',
+                    'lesson_name': 'Итоговый проект',
+                }
+                for number in range(size)
+            ],
+            'current_date': 1000198000,
+        }
+        for _ in range(count)
+    ]
+
+
+def per_dict(responses, knowns):
+    """Исходная проверка: check_response и parse_status на каждую работу."""
+    for response in responses:
+        for item in homework.check_response(response):
+            homework.parse_status(item)
+
+
+def handle(responses, knowns):
+    """Обработка ответов через handle_response, как в цикле опроса."""
+    outbox, digest = Outbox(), DigestBuffer()
+    subscriber = Subscriber('1', 'token', False)
+    for response, known in zip(responses, knowns):
+        homework.handle_response(outbox, digest, subscriber, response, known)
+
+
+def bench_known_statuses(count, size, repeat):
+    """Сравнивает исходную проверку работ с пропуском известных статусов.
+
+    Все статусы уже известны, как при догоне после простоя, когда
+    API заново отдаёт работы с момента сохранённого курсора.
+    """
+    responses = make_responses(count, size)
+    knowns = [
+        {item['homework_name']: item['status']
+         for item in response['homeworks']}
+        for response in responses
+    ]
+    records = count * size
+    for name, func in (('per-dict', per_dict), ('handle', handle)):
+        seconds = min(timeit.repeat(
+            lambda: func(responses, knowns), number=1, repeat=repeat
+        ))
+        print(f'known statuses {name}: {seconds * 1000:.1f} ms, '
+              f'{records / seconds:,.0f} records/s')
+
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def legacy_error(headers, params, error):
+    """Ошибка в прежнем виде: весь текст собирается сразу."""
+    return ConnectionError(f'Ошибка доступа {error}. '
+                           f'Проверить API: {homework.ENDPOINT}, '
+                           f'Токен авторизации: {headers}, '
+                           f'Запрос с момента времени: {params}')
+
+
+def bench_errors(count, repeat, subscribers=50):
+    """Сравнивает стоимость сбоя запроса в прежнем и новом виде.
+
+    Моделируется долгий сбой API: `count` ошибок по кругу от
+    `subscribers` подписчиков, у каждого свои токен и курсор. Лог
+    пишется в память в формате main(). Прежний путь собирает полный
+    текст ошибки с заголовками, пишет его в лог и в оповещение.
+    Новый - handle_error с ошибкой из exceptions: в лог и оповещение
+    идут суть ошибки и ключ подписчика. Отправка в Telegram
+    не измеряется.
+    """
+    error = TimeoutError('Read timed out.')
+    failures = [
+        (f'{number}:key', homework.subscriber_headers(f'token-{number}'),
+         {'from_date': 1000198000 + number})
+        for number in range(subscribers)
+    ] * (count // subscribers)
+    log = io.StringIO()
+    handler = logging.StreamHandler(log)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logging.getLogger().addHandler(handler)
+    alerts = []
+    outbox = Outbox()
+
+    def legacy():
+        for _, headers, params in failures:
+            failure = legacy_error(dict(headers), params, error)
+            logging.error(f'Сбой в работе телеграмм-бота: {failure}')
+            alerts.append(f'Проблемы: {failure}')
+
+    def emitted():
+        for key, headers, params in failures:
+            homework.handle_error(outbox, exceptions.APIConnectionError(
+                homework.ENDPOINT, headers, params, error
+            ), key)
+
+    variants = (('legacy', legacy), ('emitted', emitted))
+    best = {}
+    written = {}
+    for _ in range(repeat):
+        for name, func in variants:
+            log.seek(0)
+            log.truncate()
+            seconds = timeit.timeit(func, number=1)
+            best[name] = min(seconds, best.get(name, seconds))
+            written[name] = log.tell()
+    for name, _ in variants:
+        print(f'error {name}: {best[name] / len(failures) * 1e6:.2f} us, '
+              f'{written[name] / len(failures):.0f} log chars per failure')
+    logging.getLogger().removeHandler(handler)
+
+
+def main():
+    """Запускает микробенчмарки."""
+    parser = argparse.ArgumentParser(description='Микробенчмарки бота')
+    parser.add_argument('--responses', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    bench_known_statuses(args.responses, args.size, args.repeat)
+    logging.disable(logging.NOTSET)
+    bench_errors(args.responses, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
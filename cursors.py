@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+
+class CursorStore:
+    """Хранит курсор и известные статусы работ каждого подписчика.
+
+    Курсор - значение `from_date` для следующего запроса к API.
+    С `path` состояние переживает перезапуск: `save` атомарно
+    переписывает JSON-файл. Без `path` состояние живёт только в памяти.
+
+    Статус, поставленный в очередь отправки, хранится отдельно в памяти
+    (`queued`) и становится известным только после доставки (`ack`).
+    Пока у подписчика есть недоставленные статусы, курсор не сдвигается,
+    так что после перезапуска они запрашиваются и отправляются снова.
+    """
+
+    def __init__(self, path=None, start=None):
+        self.path = path
+        self.start = int(time.time()) if start is None else start
+        self.data = {}
+        self.pending = {}
+        self.next_cursor = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.data = json.load(file)
+
+    def entry(self, key):
+        """Возвращает запись подписчика, создавая её при первом обращении."""
+        return self.data.setdefault(
+            key, {'cursor': self.start, 'known': {}}
+        )
+
+    def cursor(self, key):
+        """Момент, с которого запрашивать статусы подписчика."""
+        return self.entry(key)['cursor']
+
+    def known(self, key):
+        """Известные статусы работ подписчика по названию работы."""
+        return self.entry(key)['known']
+
+    def queued(self, key):
+        """Статусы работ подписчика, ожидающие доставки."""
+        return self.pending.setdefault(key, {})
+
+    def advance(self, key, cursor):
+        """Сдвигает курсор подписчика, когда его статусы доставлены."""
+        if self.queued(key):
+            self.next_cursor[key] = cursor
+        else:
+            self.entry(key)['cursor'] = cursor
+
+    def ack(self, key, name, status):
+        """Отмечает статус работы доставленным."""
+        self.known(key)[name] = status
+        queued = self.queued(key)
+        if queued.get(name) == status:
+            del queued[name]
+        if not queued and key in self.next_cursor:
+            self.advance(key, self.next_cursor.pop(key))
+
+    def drop(self, key, name, status):
+        """Снимает недоставленный статус, не сдвигая курсор.
+
+        Следующий опрос запросит статус заново с прежнего курсора.
+        """
+        queued = self.queued(key)
+        if queued.get(name) == status:
+            del queued[name]
+        self.next_cursor.pop(key, None)
+
+    def refresh(self, key):
+        """Забывает недоставленные статусы подписчика.
+
+        Файл читается только при запуске, так что запись остаётся.
+        """
+        self.pending.pop(key, None)
+        self.next_cursor.pop(key, None)
+
+    def save(self):
+        """Сохраняет состояние в файл, если он задан."""
+        if not self.path:
+            return
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.data, file, ensure_ascii=False)
+        os.replace(temporary, self.path)
+
+
+class SQLiteCursorStore(CursorStore):
+    """Курсоры в базе SQLite, общей для реплик.
+
+    Запись идёт построчно и только для подписчиков, к которым
+    обращались после прошлого сохранения и аренда которых ещё
+    у реплики (`holds(key)`), так что реплика не затирает чужих
+    подписчиков. `refresh` сбрасывает кэш подписчика, чтобы
+    перечитать его после смены владельца.
+    """
+
+    def __init__(self, path, start=None, holds=None):
+        super().__init__(start=start)
+        self.holds = holds
+        self.dirty = set()
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS cursors ('
+            'key TEXT PRIMARY KEY, cursor INTEGER NOT NULL, '
+            'known TEXT NOT NULL)'
+        )
+
+    def entry(self, key):
+        """Возвращает запись подписчика, читая её из базы при промахе."""
+        self.dirty.add(key)
+        if key not in self.data:
+            row = self.connection.execute(
+                'SELECT cursor, known FROM cursors WHERE key = ?', (key,)
+            ).fetchone()
+            self.data[key] = (
+                {'cursor': row[0], 'known': json.loads(row[1])} if row
+                else {'cursor': self.start, 'known': {}}
+            )
+        return self.data[key]
+
+    def refresh(self, key):
+        """Забывает закэшированную запись подписчика."""
+        super().refresh(key)
+        self.data.pop(key, None)
+        self.dirty.discard(key)
+
+    def save(self):
+        """Сохраняет изменённые записи своих подписчиков одной транзакцией.
+
+        Запись подписчика, чья аренда ушла, не пишется и забывается.
+        """
+        if self.holds:
+            for key in [key for key in self.dirty if not self.holds(key)]:
+                logging.warning(f'Аренда {key} потеряна, курсор не сохранён')
+                self.refresh(key)
+        if not self.dirty:
+            return
+        rows = [
+            (key, self.data[key]['cursor'],
+             json.dumps(self.data[key]['known'], ensure_ascii=False))
+            for key in self.dirty
+        ]
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cursors (key, cursor, known) '
+                'VALUES (?, ?, ?)', rows
+            )
+        except sqlite3.Error:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        self.dirty.clear()
@@ -0,0 +1,104 @@
+import statistics
+import threading
+import time
+from collections import deque
+
+import telegram
+from telegram.utils.request import Request
+
+STATS_WINDOW = 1000
+
+
+def bot_id(token):
+    """Номер бота - часть токена до двоеточия, сам секрет не нужен."""
+    return token.split(':')[0]
+
+
+class DeliveryStats:
+    """Скользящая статистика отправок: задержка, ожидание пула, ошибки.
+
+    Все показатели считаются по последним `window` отправкам.
+    """
+
+    def __init__(self, window=STATS_WINDOW):
+        self.lock = threading.Lock()
+        self.sends = deque(maxlen=window)
+
+    def add(self, send, wait=0.0, ok=True):
+        """Добавляет замер одной отправки."""
+        with self.lock:
+            self.sends.append((send, wait, ok))
+
+    def snapshot(self):
+        """Возвращает счётчики и перцентили по последним отправкам."""
+        with self.lock:
+            sends = list(self.sends)
+        summary = {
+            'count': len(sends),
+            'errors': sum(1 for _, _, ok in sends if not ok),
+        }
+        for index, name in enumerate(('send', 'wait')):
+            values = sorted(sample[index] for sample in sends)
+            if values:
+                summary[f'{name}_p50'] = statistics.median(values)
+                summary[f'{name}_p95'] = values[int(0.95 * (len(values) - 1))]
+                summary[f'{name}_max'] = values[-1]
+        return summary
+
+
+class BotPool:
+    """Клиент доставки поверх одного или нескольких ботов Telegram.
+
+    У каждого бота пул из `pool_size` keep-alive соединений с явными
+    таймаутами, так что до `pool_size` отправок одного бота идут
+    параллельно. Писать в чат может только бот, которого пользователь
+    запустил или добавил в группу, поэтому чат отправляется через бота
+    из `routes` (чат -> номер бота), а без маршрута - через первого:
+    нагрузка делится между ботами маршрутами. Время ожидания свободного
+    соединения пишется в статистику, по нему подбирается `pool_size`.
+    Интерфейс `send_message` совпадает с `telegram.Bot`.
+    """
+
+    def __init__(self, tokens, routes=None, pool_size=1, connect_timeout=5.0,
+                 read_timeout=5.0):
+        if not tokens:
+            raise ValueError('Нужен хотя бы один токен бота')
+        self.pool_size = pool_size
+        self.bots = [
+            telegram.Bot(token=token, request=Request(
+                con_pool_size=pool_size,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+            ))
+            for token in tokens
+        ]
+        self.slots = [threading.BoundedSemaphore(pool_size) for _ in tokens]
+        indexes = {bot_id(token): index for index, token in enumerate(tokens)}
+        self.routes = {}
+        for chat_id, name in (routes or {}).items():
+            if name not in indexes:
+                raise ValueError(f'Чат {chat_id} закреплён за неизвестным '
+                                 f'ботом {name}')
+            self.routes[str(chat_id)] = indexes[name]
+        self.stats = DeliveryStats()
+
+    def pick(self, chat_id):
+        """Выбирает номер бота, закреплённого за чатом."""
+        return self.routes.get(str(chat_id), 0)
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Отправляет сообщение ботом, закреплённым за чатом."""
+        index = self.pick(chat_id)
+        started = time.monotonic()
+        with self.slots[index]:
+            acquired = time.monotonic()
+            wait = acquired - started
+            try:
+                result = self.bots[index].send_message(
+                    chat_id, text=text, **kwargs
+                )
+            except telegram.TelegramError:
+                self.stats.add(time.monotonic() - acquired, wait, ok=False)
+                raise
+        self.stats.add(time.monotonic() - acquired, wait)
+        return result
@@ -0,0 +1,63 @@
+import time
+
+DIGEST_INTERVAL = 24 * 60 * 60
+DIGEST_MAX_SIZE = 20
+DIGEST_HEADER = 'Сводка изменений статусов ({}):'
+
+
+class DigestBuffer:
+    """Копит смены статусов по чатам и выпускает их одним сообщением.
+
+    Сводка чата готова, когда с первой записи прошло `interval` секунд
+    или набралось `max_size` работ. Повторная смена статуса той же
+    работы заменяет прежнюю строку, так что в сводку попадает только
+    последний статус. Записи живут только в памяти: статусы из сводки
+    становятся известными после её доставки, поэтому после перезапуска
+    они снова попадают в сводку из ответа API.
+    """
+
+    def __init__(self, interval=DIGEST_INTERVAL, max_size=DIGEST_MAX_SIZE,
+                 clock=time.time):
+        self.interval = interval
+        self.max_size = max_size
+        self.clock = clock
+        self.entries = {}
+        self.started = {}
+
+    def add(self, chat_id, key, text, ack=None):
+        """Добавляет смену статуса работы `key` в сводку чата.
+
+        `ack` доставляется вместе со сводкой, как `acks` в Outbox.
+        """
+        self.entries.setdefault(chat_id, {})[key] = (text, ack)
+        self.started.setdefault(chat_id, self.clock())
+
+    def discard(self, keys):
+        """Убирает из сводок записи со статусами подписчиков `keys`."""
+        for chat_id in list(self.entries):
+            entries = self.entries[chat_id]
+            for key, (_, ack) in list(entries.items()):
+                if ack is not None and ack[0] in keys:
+                    del entries[key]
+            if not entries:
+                del self.entries[chat_id]
+                del self.started[chat_id]
+
+    def due(self, force=False):
+        """Возвращает готовые сводки (чат, текст, acks) и очищает их."""
+        now = self.clock()
+        ready = [
+            chat_id for chat_id, entries in self.entries.items()
+            if force
+            or len(entries) >= self.max_size
+            or now - self.started[chat_id] >= self.interval
+        ]
+        digests = []
+        for chat_id in ready:
+            entries = list(self.entries.pop(chat_id).values())
+            del self.started[chat_id]
+            lines = [text for text, _ in entries]
+            digests.append((chat_id, '\n'.join(
+                [DIGEST_HEADER.format(len(lines))] + lines
+            ), [ack for _, ack in entries if ack is not None]))
+        return digests
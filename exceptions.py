@@ -1,10 +1,104 @@
-class StatusCodeError(Exception):
-    pass
+SECRET_HEADERS = {'authorization', 'proxy-authorization', 'cookie'}
+
+
+def redact(headers):
+    """Маскирует учётные данные в заголовках, оставляя схему."""
+    redacted = {}
+    for name, value in headers.items():
+        if name.lower() in SECRET_HEADERS:
+            scheme, _, secret = str(value).partition(' ')
+            value = f'{scheme} ***' if secret else '***'
+        redacted[name] = value
+    return redacted
+
+
+class RedactedHeaders(dict):
+    """Заголовки запроса, замаскированные один раз при создании.
+
+    `redacted` - текст заголовков для ошибок. Заголовки не должны
+    меняться после создания.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.redacted = str(redact(self))
+
+
+class APIError(Exception):
+    """Ошибка запроса к API.
+
+    Аргументы (endpoint, headers, params, detail) хранятся в `args`
+    как есть, поэтому выводить `args` нельзя. Текст собирается только
+    при первом выводе и кэшируется, учётные данные в заголовках
+    при этом маскируются.
+    """
+
+    text = None
+
+    @property
+    def endpoint(self):
+        """Адрес эндпоинта API."""
+        return self.args[0]
+
+    @property
+    def headers(self):
+        """Заголовки запроса как есть, с учётными данными."""
+        return self.args[1]
+
+    @property
+    def params(self):
+        """Параметры запроса."""
+        return self.args[2]
+
+    @property
+    def detail(self):
+        """Подробность сбоя, своя для каждого вида ошибки."""
+        return self.args[3]
+
+    def describe(self):
+        """Краткая суть ошибки без параметров запроса."""
+        return 'Ошибка запроса к API.'
+
+    def __str__(self):
+        """Полный текст ошибки с замаскированными заголовками."""
+        if self.text is None:
+            endpoint, headers, params, _ = self.args
+            redacted = getattr(headers, 'redacted', None) or redact(headers)
+            self.text = (f'{self.describe()} '
+                         f'Проверить API: {endpoint}, '
+                         f'Токен авторизации: {redacted}, '
+                         f'Запрос с момента времени: {params}')
+        return self.text
+
+    def __repr__(self):
+        """Имя класса и полный текст ошибки."""
+        return f'{type(self).__name__}({self})'
+
+
+class APIConnectionError(APIError):
+    """API недоступен: `detail` - исключение запроса."""
+
+    def describe(self):
+        """Суть сбоя соединения."""
+        return f'Ошибка доступа {self.detail}.'
+
+
+class StatusCodeError(APIError):
+    """API ответил не кодом 200: `detail` - код ответа."""
+
+    def describe(self):
+        """Суть ошибки с кодом ответа."""
+        return f'Ошибка ответа сервера, код возврата {self.detail}.'
 
 
 class ForeignServerError(Exception):
-    pass
+    """Ошибка стороннего сервера."""
+
 
+class ResponseError(APIError):
+    """Ответ API содержит ошибку: `detail` - пара (ключ, значение)."""
 
-class ResponseError(Exception):
-    pass
+    def describe(self):
+        """Суть ошибки из ответа API."""
+        key, value = self.detail
+        return f'Ответ API содержит {key}: {value}.'
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHECK_INTERVAL = 5
+
+
+class Watchdog:
+    """Следит за ходом цикла бота, запросов к API и отправок.
+
+    Операция считается зависшей, если с её начала или последней
+    отметки прогресса прошло больше её срока из `deadlines` (по префиксу
+    имени до двоеточия) или `default_deadline`. Долгая операция из
+    многих шагов отмечает прогресс после каждого шага, так что срок
+    задаётся на шаг, а не на всю операцию. Ожидание между опросами
+    зависанием не является. Операции по подписчикам отслеживаются
+    под именем `вид:ключ`, наружу `status` отдаёт только вид.
+    """
+
+    def __init__(self, deadlines=None, default_deadline=600,
+                 clock=time.monotonic):
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.running = {}
+        self.last_ok = {}
+
+    @contextmanager
+    def track(self, name):
+        """Отмечает начало и успешное завершение операции `name`.
+
+        Возвращает функцию `beat(wait=0)`, отмечающую прогресс операции.
+        `wait` - секунды предстоящего ожидания, которые не считаются
+        зависанием.
+        """
+        token = object()
+
+        def beat(wait=0):
+            with self.lock:
+                self.running[token] = (name, self.clock() + wait)
+
+        beat()
+        try:
+            yield beat
+        finally:
+            with self.lock:
+                del self.running[token]
+        with self.lock:
+            self.last_ok[name] = self.clock()
+
+    def wrap_api(self, fetch):
+        """Оборачивает запрос к API отслеживанием по подписчику."""
+        def tracked(subscriber, current_timestamp):
+            with self.track(f'api:{subscriber.key}'):
+                return fetch(subscriber, current_timestamp)
+        return tracked
+
+    def wrap_bot(self, bot):
+        """Оборачивает бота отслеживанием отправок."""
+        return WatchedBot(bot, self)
+
+    def stalled(self):
+        """Возвращает имена операций, превысивших свой срок."""
+        now = self.clock()
+        with self.lock:
+            running = list(self.running.values())
+        return sorted({
+            name for name, started in running
+            if now - started > self.deadlines.get(
+                name.split(':')[0], self.default_deadline
+            )
+        })
+
+    def status(self):
+        """Возвращает состояние для проверки здоровья.
+
+        Операции по подписчикам сводятся к своему виду, чтобы номера
+        чатов не попадали в ответ: для вида берётся самый свежий успех.
+        """
+        now = self.clock()
+        ages = {}
+        with self.lock:
+            for name, moment in self.last_ok.items():
+                kind = name.split(':')[0]
+                age = round(now - moment, 1)
+                ages[kind] = min(age, ages.get(kind, age))
+        stalled = sorted({name.split(':')[0] for name in self.stalled()})
+        return {
+            'alive': not stalled,
+            'ready': not stalled and 'loop' in ages,
+            'stalled': stalled,
+            'last_ok_seconds_ago': ages,
+        }
+
+    def monitor(self, on_stall, interval=CHECK_INTERVAL):
+        """Запускает фоновую проверку, вызывающую `on_stall(names)`."""
+        def run():
+            while True:
+                time.sleep(interval)
+                stalled = self.stalled()
+                if stalled:
+                    on_stall(stalled)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+class WatchedBot:
+    """Прокси бота, отмечающий отправки в сторожевом таймере."""
+
+    def __init__(self, bot, watchdog):
+        self.bot = bot
+        self.watchdog = watchdog
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Отправляет сообщение под наблюдением."""
+        with self.watchdog.track('send'):
+            return self.bot.send_message(chat_id, text=text, **kwargs)
+
+
+def restart(stalled):
+    """Завершает процесс, чтобы платформа перезапустила воркер."""
+    logging.critical(f'Бот завис на {stalled}, перезапуск')
+    os._exit(1)
+
+
+def warn(stalled):
+    """Сообщает о зависании в лог."""
+    logging.error(f'Бот завис на {stalled}')
+
+
+def serve(watchdog, port, host='127.0.0.1'):
+    """Поднимает локальный HTTP-сервер с путями /health и /ready в фоне."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status = watchdog.status()
+            checks = {'/health': 'alive', '/ready': 'ready'}
+            if self.path not in checks:
+                self.send_error(404)
+                return
+            body = json.dumps(status).encode()
+            self.send_response(200 if status[checks[self.path]] else 503)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
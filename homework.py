@@ -1,24 +1,60 @@
 import logging
 import os
+import signal
 import sys
-import time
+import threading
+from functools import lru_cache, partial
 
 import requests
 import telegram
 from dotenv import load_dotenv
 
 import exceptions
+import health
+from backfill import catch_up
+from cursors import CursorStore, SQLiteCursorStore
+from delivery import BotPool
+from digest import DigestBuffer
+from leases import Coordinator, LocalLeases, SQLiteLeases, make_owner
+from outbox import DIGEST, ERROR, TRANSITION, Outbox
+from recorder import TraceRecorder
+from subscribers import bot_routes, load_subscribers
 
 load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TRACE_FILE = os.getenv('TRACE_FILE')
+TELEGRAM_EXTRA_TOKENS = [
+    token for token in os.getenv('TELEGRAM_EXTRA_TOKENS', '').split(',')
+    if token
+]
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', 4))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', 5))
+TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', 10))
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE')
+DIGEST_MODE = os.getenv('DIGEST_MODE', '').lower() in ('1', 'true', 'yes')
+DIGEST_INTERVAL = int(os.getenv('DIGEST_INTERVAL', 24 * 60 * 60))
+DIGEST_MAX_SIZE = int(os.getenv('DIGEST_MAX_SIZE', 20))
+STATE_FILE = os.getenv('STATE_FILE')
+CATCHUP_WORKERS = int(os.getenv('CATCHUP_WORKERS', 4))
+CATCHUP_BATCH = int(os.getenv('CATCHUP_BATCH', 20))
+CATCHUP_MAX_AGE = int(os.getenv('CATCHUP_MAX_AGE', 30 * 24 * 60 * 60))
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', 30))
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', 0))
+WATCHDOG_RESTART = os.getenv('WATCHDOG_RESTART', '').lower() in (
+    '1', 'true', 'yes'
+)
+LEASE_DB = os.getenv('LEASE_DB')
+LEASE_TTL = float(os.getenv('LEASE_TTL', 30))
 
 TOKENS = ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
 RETRY_TIME = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+HEADERS = exceptions.RedactedHeaders(
+    {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+)
 
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -27,10 +63,10 @@ HOMEWORK_STATUSES = {
 }
 
 
-def send_message(bot, message):
-    """Отправляет сообщение в Telegram."""
+def deliver(bot, chat_id, message):
+    """Отправляет сообщение в указанный чат Telegram."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id, text=message)
         logging.info(f'Бот отправил сообщение "{message}"')
         return True
     except telegram.TelegramError as error:
@@ -38,40 +74,57 @@ def send_message(bot, message):
         return False
 
 
-def get_api_answer(current_timestamp):
-    """Делает запрос к эндпоинту API."""
+def send_message(bot, message):
+    """Отправляет сообщение в Telegram."""
+    return deliver(bot, TELEGRAM_CHAT_ID, message)
+
+
+def request_statuses(headers, current_timestamp):
+    """Делает запрос к эндпоинту API с заданными заголовками."""
     params = {'from_date': current_timestamp}
     try:
         response = requests.get(
             ENDPOINT,
-            headers=HEADERS,
-            params=params
+            headers=headers,
+            params=params,
+            timeout=API_TIMEOUT
         )
     except requests.exceptions.RequestException as error:
-        raise ConnectionError(f'Ошибка доступа {error}. '
-                              f'Проверить API: {ENDPOINT}, '
-                              f'Токен авторизации: {HEADERS}, '
-                              f'Запрос с момента времени: {params}')
+        raise exceptions.APIConnectionError(ENDPOINT, headers, params, error)
     response_json = response.json()
     for key in ['code', 'error']:
         if key in response_json:
             raise exceptions.ResponseError(
-                f'{key},'
-                f'{response_json[key]},'
-                f'{ENDPOINT},'
-                f'{HEADERS},'
-                f'{params}'
+                ENDPOINT, headers, params, (key, response_json[key])
             )
     if response.status_code != 200:
         raise exceptions.StatusCodeError(
-            f'Ошибка ответа сервера. Проверить API: {ENDPOINT}, '
-            f'Токен авторизации: {HEADERS}, '
-            f'Запрос с момента времени: {params},'
-            f'Код возврата {response.status_code}'
+            ENDPOINT, headers, params, response.status_code
         )
     return response_json
 
 
+def get_api_answer(current_timestamp):
+    """Делает запрос к эндпоинту API."""
+    return request_statuses(HEADERS, current_timestamp)
+
+
+@lru_cache(maxsize=None)
+def subscriber_headers(token):
+    """Заголовки запроса с токеном подписчика, один объект на токен.
+
+    Маскировка для текста ошибок делается здесь же, один раз на токен.
+    """
+    return exceptions.RedactedHeaders({'Authorization': f'OAuth {token}'})
+
+
+def get_subscriber_answer(subscriber, current_timestamp):
+    """Делает запрос к эндпоинту API от имени подписчика."""
+    return request_statuses(
+        subscriber_headers(subscriber.token), current_timestamp
+    )
+
+
 def check_response(response):
     """Проверяет ответ API на корректность."""
     if not isinstance(response, dict):
@@ -106,32 +159,219 @@ def check_tokens():
     return True
 
 
+def handle_response(outbox, digest, subscriber, response, known,
+                    queued=None):
+    """Обрабатывает ответ API и ставит новые статусы в очередь отправки.
+
+    `known` - доставленные статусы работ подписчика, `queued` - статусы,
+    ожидающие доставки. Работы с таким статусом пропускаются ещё до
+    сборки сообщения, так что повторно полученные при догоне работы
+    стоят два поиска в словаре.
+    Сообщение о смене статуса или сводка несёт его в `acks`, известным
+    статус станет после отправки. Подписчикам в режиме сводки статусы
+    копятся в `digest`.
+    """
+    queued = {} if queued is None else queued
+    homeworks = check_response(response)
+    if not homeworks:
+        logging.info("Новые статусы отсутствуют.")
+        return
+    for homework in reversed(homeworks):
+        name = homework['homework_name']
+        status = homework['status']
+        if known.get(name) == status or queued.get(name) == status:
+            continue
+        mes = parse_status(homework)
+        queued[name] = status
+        ack = (subscriber.key, name, status)
+        if subscriber.digest:
+            digest.add(subscriber.chat_id, (subscriber.key, name), mes, ack)
+        else:
+            outbox.put(TRANSITION, subscriber.chat_id, mes, [ack])
+
+
+def handle_error(outbox, error, key=None):
+    """Логирует сбой и ставит сообщение о нём в очередь отправки.
+
+    Для ошибки запроса к API в лог и оповещение идёт только её суть
+    и ключ подписчика `key`, без параметров запроса: одинаковые сбои
+    разных подписчиков склеиваются в очереди, а полный текст ошибки
+    с заголовками и параметрами не собирается.
+    """
+    if isinstance(error, exceptions.APIError):
+        error = error.describe()
+    logging.error('Сбой в работе телеграмм-бота (%s): %s', key, error)
+    outbox.put(ERROR, TELEGRAM_CHAT_ID, f'Проблемы: {error}')
+
+
+def poll_subscriber(fetch, outbox, digest, subscriber, store):
+    """Опрашивает API для подписчика и сдвигает его курсор в `store`."""
+    current_timestamp = store.cursor(subscriber.key)
+    try:
+        response = fetch(subscriber, current_timestamp)
+        handle_response(
+            outbox, digest, subscriber, response,
+            store.known(subscriber.key), store.queued(subscriber.key)
+        )
+        store.advance(
+            subscriber.key, response.get('current_date', current_timestamp)
+        )
+    except Exception as error:
+        handle_error(outbox, error, subscriber.key)
+
+
+def flush_outbox(outbox, store, send, until=None, beat=None, holds=None):
+    """Отправляет очередь и сохраняет доставленные статусы известными.
+
+    `beat` отмечает прогресс после каждой пачки отправок. С `holds`
+    статусы подписчика отправляются, только пока `holds(key)` истинно,
+    иначе снимаются с очереди и будут запрошены заново.
+    """
+    def check(message):
+        if holds is None or all(holds(key) for key, _, _ in message.acks):
+            return True
+        for key, name, status in message.acks:
+            store.drop(key, name, status)
+        logging.warning(f'Аренда истекает, сообщение в {message.chat_id} '
+                        f'не отправлено')
+        return False
+
+    for message in outbox.drain(send, until=until, check=check, beat=beat):
+        for key, name, status in message.acks:
+            store.ack(key, name, status)
+        if message.acks:
+            store.save()
+
+
+def open_state(subscribers, alive=None):
+    """Готовит хранилище курсоров и координатор реплик.
+
+    С LEASE_DB реплики делят подписчиков через аренды и хранят
+    курсоры в той же базе SQLite, иначе всё состояние локально.
+    Аренды продлеваются, только пока `alive()` истинно, и должны
+    пережить одну отправку в Telegram.
+    """
+    if not LEASE_DB:
+        return CursorStore(STATE_FILE), Coordinator(
+            LocalLeases(), subscribers, alive=alive
+        )
+    owner = make_owner()
+    logging.info(f'Реплика {owner}, аренды в {LEASE_DB}')
+    coordinator = Coordinator(
+        SQLiteLeases(LEASE_DB, owner, LEASE_TTL), subscribers, LEASE_TTL / 3,
+        alive=alive, margin=TELEGRAM_CONNECT_TIMEOUT + TELEGRAM_READ_TIMEOUT,
+    )
+    return SQLiteCursorStore(
+        LEASE_DB, holds=lambda key: coordinator.holds(key, margin=0)
+    ), coordinator
+
+
+def forget(keys, outbox, digest, store):
+    """Забывает всё недоставленное подписчиков, сменивших владельца.
+
+    Их сообщения убираются из очереди и сводок, а запись в `store`
+    перечитывается: новые статусы снова придут из API от курсора
+    в общей базе, так что ничего не отправляется дважды.
+    """
+    for message in outbox.discard(keys):
+        for key, name, status in message.acks:
+            store.drop(key, name, status)
+    digest.discard(keys)
+    for key in keys:
+        store.refresh(key)
+
+
+def run_cycle(fetch, outbox, digest, store, coordinator, beat=None):
+    """Опрашивает подписчиков этой реплики и ставит сводки в очередь.
+
+    `beat()` вызывается после опроса каждого подписчика.
+    """
+    forget(coordinator.take_changed(), outbox, digest, store)
+    for subscriber in coordinator.owned():
+        poll_subscriber(fetch, outbox, digest, subscriber, store)
+        if beat:
+            beat()
+    store.save()
+    for chat_id, text, acks in digest.due():
+        outbox.put(DIGEST, chat_id, text, acks)
+
+
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
         raise ValueError('Проверьте значение токенов')
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    old_message = ''
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            if not homeworks:
-                logging.info("Новые статусы отсутствуют.")
-            else:
-                mes = parse_status(homeworks[0])
-                if mes != old_message:
-                    if send_message(bot, mes):
-                        old_message = mes
-            current_timestamp = response.get(
-                'current_date', current_timestamp
-            )
-        except Exception as error:
-            message = f'Сбой в работе телеграмм-бота: {error}'
-            logging.error(message)
-            send_message(TELEGRAM_CHAT_ID, f'Проблемы: {error}')
-        time.sleep(RETRY_TIME)
+    subscribers = load_subscribers(
+        SUBSCRIBERS_FILE, TELEGRAM_CHAT_ID, PRACTICUM_TOKEN, DIGEST_MODE
+    )
+    pool = BotPool(
+        [TELEGRAM_TOKEN] + TELEGRAM_EXTRA_TOKENS,
+        routes=bot_routes(subscribers),
+        pool_size=TELEGRAM_POOL_SIZE,
+        connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+        read_timeout=TELEGRAM_READ_TIMEOUT,
+    )
+    send_deadline = 2 * (TELEGRAM_CONNECT_TIMEOUT + TELEGRAM_READ_TIMEOUT)
+    watchdog = health.Watchdog(
+        {
+            'api': 2 * API_TIMEOUT,
+            'send': send_deadline,
+            'loop': 4 * API_TIMEOUT,
+            'catchup': 4 * API_TIMEOUT + send_deadline,
+            'flush': len(pool.bots) * send_deadline,
+        },
+        default_deadline=RETRY_TIME,
+    )
+    watchdog.monitor(health.restart if WATCHDOG_RESTART else health.warn)
+    if HEALTH_PORT:
+        health.serve(watchdog, HEALTH_PORT)
+    bot = watchdog.wrap_bot(pool)
+    fetch = watchdog.wrap_api(get_subscriber_answer)
+    if TRACE_FILE:
+        recorder = TraceRecorder(TRACE_FILE)
+        fetch = recorder.wrap_api(fetch)
+        bot = recorder.wrap_bot(bot)
+        logging.info(f'Запись трассы в {TRACE_FILE}')
+    outbox = Outbox(workers=TELEGRAM_POOL_SIZE * len(pool.bots))
+    digest = DigestBuffer(DIGEST_INTERVAL, DIGEST_MAX_SIZE)
+    store, coordinator = open_state(
+        subscribers, alive=lambda: not watchdog.stalled()
+    )
+    coordinator.claim()
+    coordinator.take_changed()
+    send = partial(deliver, bot)
+    with watchdog.track('catchup') as beat:
+        catch_up(
+            coordinator.owned(), store, fetch,
+            lambda fetch, subscriber: poll_subscriber(
+                fetch, outbox, digest, subscriber, store
+            ),
+            lambda: flush_outbox(
+                outbox, store, send, beat=beat, holds=coordinator.holds
+            ),
+            lag=2 * RETRY_TIME,
+            max_age=CATCHUP_MAX_AGE,
+            workers=CATCHUP_WORKERS,
+            batch_size=CATCHUP_BATCH,
+            beat=beat,
+        )
+    wake = threading.Event()
+    coordinator.start(wake)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        while True:
+            until = outbox.clock() + RETRY_TIME
+            with watchdog.track('loop') as beat:
+                run_cycle(fetch, outbox, digest, store, coordinator, beat)
+            with watchdog.track('flush') as beat:
+                flush_outbox(
+                    outbox, store, send, until, beat=beat,
+                    holds=coordinator.holds
+                )
+            logging.info(f'Статистика доставки: {pool.stats.snapshot()}')
+            wake.wait(max(0, until - outbox.clock()))
+            wake.clear()
+    finally:
+        coordinator.release()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,168 @@
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+LEASE_TTL = 30
+LEASE_MARGIN = LEASE_TTL / 6
+
+
+def make_owner():
+    """Уникальное имя реплики."""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class LocalLeases:
+    """Аренды без координации: единственная реплика владеет всеми."""
+
+    def acquire(self, name):
+        """Всегда выдаёт бессрочную аренду."""
+        return math.inf
+
+    def release(self, name):
+        """Ничего не делает."""
+
+
+class SQLiteLeases:
+    """Аренды подписчиков в файле SQLite, общем для реплик.
+
+    Аренда принадлежит одной реплике, пока та продлевает её чаще,
+    чем раз в `ttl` секунд. Просроченную аренду забирает любая
+    реплика. Захват и продление - один атомарный запрос. Занятая база
+    ждёт не дольше `ttl / 6`, чтобы продление успело до конца аренды.
+    """
+
+    def __init__(self, path, owner, ttl=LEASE_TTL, clock=time.time):
+        self.owner = owner
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=ttl / 6, isolation_level=None,
+            check_same_thread=False
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'name TEXT PRIMARY KEY, owner TEXT NOT NULL, '
+            'expires REAL NOT NULL)'
+        )
+
+    def acquire(self, name):
+        """Захватывает или продлевает аренду.
+
+        Возвращает момент окончания аренды или None, если она чужая.
+        """
+        now = self.clock()
+        expires = now + self.ttl
+        with self.lock:
+            cursor = self.connection.execute(
+                'INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET '
+                'owner = excluded.owner, expires = excluded.expires '
+                'WHERE leases.owner = excluded.owner OR leases.expires < ?',
+                (name, self.owner, expires, now)
+            )
+        return expires if cursor.rowcount == 1 else None
+
+    def release(self, name):
+        """Отдаёт аренду, если она принадлежит этой реплике."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM leases WHERE name = ? AND owner = ?',
+                (name, self.owner)
+            )
+
+
+class Coordinator:
+    """Решает, каких подписчиков опрашивает эта реплика.
+
+    Фоновый поток каждые `renew_every` секунд захватывает и продлевает
+    аренды всех подписчиков. Когда реплика получает нового подписчика,
+    поднимается `wake`, чтобы цикл опроса не ждал полный интервал.
+    Пока `alive()` ложно, аренды не продлеваются: зависшая реплика
+    отдаёт подписчиков другим. `holds` проверяет, что аренда
+    продержится ещё `margin` секунд по часам `clock` аренд и не менялась
+    с прошлого `take_changed`: сообщения, поставленные при прежнем
+    владении, по ней не отправляются.
+    """
+
+    def __init__(self, leases, subscribers, renew_every=LEASE_TTL / 3,
+                 alive=None, margin=LEASE_MARGIN, clock=time.time):
+        self.leases = leases
+        self.subscribers = subscribers
+        self.renew_every = renew_every
+        self.alive = alive
+        self.margin = margin
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.held = {}
+        self.changed = set()
+
+    def claim(self):
+        """Обновляет аренды, возвращает число новых подписчиков."""
+        if self.alive and not self.alive():
+            logging.warning('Цикл бота завис, аренды не продлеваются')
+            return 0
+        held = {}
+        for subscriber in self.subscribers:
+            try:
+                expires = self.leases.acquire(subscriber.key)
+            except sqlite3.Error as error:
+                logging.error(f'Аренда {subscriber.key} не обновлена: '
+                              f'{error}')
+                continue
+            if expires is not None:
+                held[subscriber.key] = expires
+        with self.lock:
+            gained = held.keys() - self.held.keys()
+            lost = self.held.keys() - held.keys()
+            for key in lost:
+                logging.warning(f'Подписчик {key} перешёл к другой реплике')
+            self.changed |= gained | lost
+            self.held = held
+        return len(gained)
+
+    def owned(self):
+        """Подписчики, аренда которых сейчас у этой реплики."""
+        with self.lock:
+            return [
+                subscriber for subscriber in self.subscribers
+                if subscriber.key in self.held
+            ]
+
+    def holds(self, key, margin=None):
+        """Проверяет, что аренда подписчика `key` ещё действует."""
+        margin = self.margin if margin is None else margin
+        with self.lock:
+            if key in self.changed:
+                return False
+            expires = self.held.get(key)
+        return expires is not None and self.clock() + margin < expires
+
+    def take_changed(self):
+        """Возвращает и сбрасывает ключи подписчиков, сменивших владельца."""
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def start(self, wake):
+        """Запускает фоновое продление аренд."""
+        def run():
+            while True:
+                time.sleep(self.renew_every)
+                if self.claim():
+                    wake.set()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def release(self):
+        """Отдаёт все аренды этой реплики."""
+        with self.lock:
+            held, self.held = self.held, {}
+        for key in held:
+            self.leases.release(key)
@@ -0,0 +1,223 @@
+import logging
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+TRANSITION = 'transition'
+DIGEST = 'digest'
+ERROR = 'error'
+
+PRIORITIES = (TRANSITION, DIGEST, ERROR)
+BUDGETS = {
+    TRANSITION: (30 / 60, 30),
+    DIGEST: (20 / 60, 20),
+    ERROR: (1 / 1800, 2),
+}
+ERROR_QUEUE_SIZE = 10
+MAX_WAIT = 1800
+
+Message = namedtuple(
+    'Message', ['kind', 'chat_id', 'text', 'enqueued', 'acks'],
+    defaults=((),)
+)
+
+
+class RateBudget:
+    """Бюджет отправок класса: `rate` сообщений в секунду, запас `burst`."""
+
+    def __init__(self, rate, burst, clock):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def available(self):
+        """Пополняет бюджет и проверяет, можно ли отправить сообщение."""
+        now = self.clock()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        return self.tokens >= 1
+
+    def spend(self):
+        """Списывает одну отправку."""
+        self.tokens -= 1
+
+    def wait(self):
+        """Секунды до следующей доступной отправки."""
+        return max(0, (1 - self.tokens) / self.rate)
+
+
+class Outbox:
+    """Очередь исходящих сообщений с приоритетами классов.
+
+    Смены статусов уходят раньше дайджестов, а дайджесты - раньше
+    сообщений об ошибках. У каждого класса свой бюджет отправок.
+    Сообщение, прождавшее дольше `max_wait`, уходит первым независимо
+    от класса. Одинаковые ожидающие сообщения об ошибках склеиваются.
+    `sleep` ждёт пополнения бюджета в часах `clock`. До `workers`
+    сообщений в разные чаты отправляются параллельно, сообщения
+    одного чата уходят по порядку.
+    """
+
+    def __init__(self, budgets=None, max_wait=MAX_WAIT, clock=time.monotonic,
+                 sleep=time.sleep, workers=1):
+        budgets = budgets or BUDGETS
+        self.clock = clock
+        self.sleep = sleep
+        self.max_wait = max_wait
+        self.workers = workers
+        self.executor = (
+            ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        )
+        self.budgets = {
+            kind: RateBudget(*budgets[kind], clock) for kind in PRIORITIES
+        }
+        self.queues = {kind: deque() for kind in PRIORITIES}
+        self.queues[ERROR] = deque(maxlen=ERROR_QUEUE_SIZE)
+
+    def __len__(self):
+        """Число сообщений, ожидающих отправки."""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def put(self, kind, chat_id, text, acks=()):
+        """Ставит сообщение в очередь своего класса.
+
+        `acks` - статусы (подписчик, работа, статус), которые
+        сообщение доставляет.
+        """
+        queue = self.queues[kind]
+        if kind == ERROR:
+            for message in queue:
+                if message.text == text and message.chat_id == chat_id:
+                    return
+        queue.append(Message(kind, chat_id, text, self.clock(), tuple(acks)))
+
+    def next_kind(self):
+        """Выбирает класс, из которого отправлять следующее сообщение."""
+        ready = [
+            kind for kind in PRIORITIES
+            if self.queues[kind] and self.budgets[kind].available()
+        ]
+        if not ready:
+            return None
+        oldest = min(ready, key=lambda kind: self.queues[kind][0].enqueued)
+        if self.clock() - self.queues[oldest][0].enqueued > self.max_wait:
+            return oldest
+        return ready[0]
+
+    def pause(self):
+        """Секунды до пополнения бюджета непустого класса, None без очереди."""
+        waits = [
+            self.budgets[kind].wait() for kind in PRIORITIES
+            if self.queues[kind]
+        ]
+        return min(waits) if waits else None
+
+    def discard(self, keys):
+        """Убирает из очереди сообщения со статусами подписчиков `keys`.
+
+        Возвращает убранные сообщения.
+        """
+        discarded = []
+        for kind, queue in self.queues.items():
+            kept = []
+            for message in queue:
+                if any(key in keys for key, _, _ in message.acks):
+                    discarded.append(message)
+                else:
+                    kept.append(message)
+            queue.clear()
+            queue.extend(kept)
+        return discarded
+
+    def take(self, size, check=None):
+        """Снимает с очереди до `size` готовых сообщений в разные чаты.
+
+        Сообщение, для которого `check(message)` ложно, отбрасывается,
+        не расходуя бюджет.
+        """
+        batch = []
+        chats = set()
+        while len(batch) < size:
+            kind = self.next_kind()
+            if kind is None or self.queues[kind][0].chat_id in chats:
+                break
+            message = self.queues[kind].popleft()
+            if check and not check(message):
+                continue
+            self.budgets[kind].spend()
+            batch.append(message)
+            chats.add(message.chat_id)
+        return batch
+
+    def send_batch(self, send, batch):
+        """Отправляет пачку сообщений, возвращает успех каждого."""
+        if self.executor is None or len(batch) == 1:
+            return [send(message.chat_id, message.text) for message in batch]
+        return list(self.executor.map(
+            lambda message: send(message.chat_id, message.text), batch
+        ))
+
+    def requeue(self, failed):
+        """Возвращает неотправленные сообщения в начало своих очередей.
+
+        Сообщения об ошибках не возвращаются.
+        """
+        for message in reversed(failed):
+            if message.kind != ERROR:
+                self.queues[message.kind].appendleft(message)
+
+    def flush(self, send, limit=None, until=None, check=None):
+        """Отправляет сообщения и возвращает список отправленных."""
+        return list(self.drain(send, limit, until, check))
+
+    def drain(self, send, limit=None, until=None, check=None, beat=None):
+        """Отправляет сообщения, пока позволяют бюджеты и `limit`.
+
+        `send(chat_id, text)` возвращает успех отправки. На первой
+        неудаче отправка прекращается: смена статуса или дайджест
+        остаются в начале очереди, сообщение об ошибке отбрасывается.
+        С `until` исчерпанный бюджет не останавливает отправку:
+        очередь ждёт его пополнения, пока не наступит момент `until`.
+        После `until` отправка прекращается, даже если бюджет остался.
+        Отправленные сообщения выдаются по одному сразу после отправки
+        своей пачки. Сообщение, для которого `check(message)` ложно,
+        отбрасывается перед отправкой, не расходуя бюджет.
+        `beat()` вызывается после каждой пачки, а перед ожиданием
+        бюджета - `beat(pause)`.
+        """
+        beat = beat or (lambda wait=0: None)
+        count = 0
+        while limit is None or count < limit:
+            if until is not None and self.clock() >= until:
+                break
+            size = self.workers if limit is None else min(
+                self.workers, limit - count
+            )
+            batch = self.take(size, check)
+            if not batch:
+                pause = self.pause()
+                if (pause is None or until is None
+                        or self.clock() + pause >= until):
+                    break
+                beat(pause)
+                self.sleep(pause)
+                continue
+            results = self.send_batch(send, batch)
+            failed = [
+                message for message, ok in zip(batch, results) if not ok
+            ]
+            self.requeue(failed)
+            beat()
+            for message, ok in zip(batch, results):
+                if ok:
+                    count += 1
+                    yield message
+            if failed:
+                logging.warning(
+                    f'Отправка прервана, в очереди {len(self)} сообщений'
+                )
+                break
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+import telegram
+
+
+class TraceRecorder:
+    """Записывает ответы API и результаты отправки в файл трассы.
+
+    Каждая строка файла - компактный JSON с отметкой времени `t`
+    и типом события `kind`: `api` или `send`. Длительность вызова
+    измеряется часами `timer`. Об ошибке API пишется только имя её
+    класса: текст ошибки может содержать учётные данные запроса.
+    """
+
+    def __init__(self, path, clock=time.time, timer=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.timer = timer
+        self.file = open(path, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def write(self, kind, **fields):
+        """Дописывает событие в трассу."""
+        record = {'t': round(self.clock(), 3), 'kind': kind}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def wrap_api(self, fetch):
+        """Оборачивает запрос к API записью ответа или ошибки."""
+        def recorded(subscriber, current_timestamp):
+            started = self.timer()
+            try:
+                response = fetch(subscriber, current_timestamp)
+            except Exception as error:
+                self.write(
+                    'api', sub=subscriber.key, from_date=current_timestamp,
+                    error=type(error).__name__,
+                    duration=round(self.timer() - started, 4)
+                )
+                raise
+            self.write(
+                'api', sub=subscriber.key, from_date=current_timestamp,
+                response=response,
+                duration=round(self.timer() - started, 4)
+            )
+            return response
+        return recorded
+
+    def wrap_bot(self, bot):
+        """Оборачивает бота записью исхода каждой отправки."""
+        return RecordingBot(bot, self)
+
+    def close(self):
+        """Закрывает файл трассы."""
+        self.file.close()
+
+
+class RecordingBot:
+    """Прокси бота, записывающий исход и длительность отправки."""
+
+    def __init__(self, bot, recorder):
+        self.bot = bot
+        self.recorder = recorder
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Отправляет сообщение и записывает результат в трассу."""
+        timer = self.recorder.timer
+        started = timer()
+        try:
+            result = self.bot.send_message(chat_id, text=text, **kwargs)
+        except telegram.TelegramError as error:
+            self.recorder.write(
+                'send', ok=False, error=str(error),
+                duration=round(timer() - started, 4)
+            )
+            raise
+        self.recorder.write(
+            'send', ok=True, duration=round(timer() - started, 4)
+        )
+        return result
+
+
+def read_trace(path):
+    """Читает события трассы в порядке записи."""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
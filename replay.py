@@ -0,0 +1,206 @@
+import argparse
+import bisect
+import logging
+import statistics
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+
+import telegram
+
+import homework
+from cursors import CursorStore
+from digest import DigestBuffer
+from outbox import DIGEST, Outbox
+from recorder import read_trace
+
+ReplayReport = namedtuple(
+    'ReplayReport',
+    ['polls', 'sent', 'failed', 'virtual_seconds', 'wall_seconds',
+     'latencies']
+)
+
+
+class VirtualClock:
+    """Виртуальное время воспроизведения, без реального ожидания."""
+
+    def __init__(self, start):
+        self.now = start
+
+    def advance(self, seconds):
+        """Сдвигает виртуальное время вперёд."""
+        self.now += seconds
+
+
+ReplaySubscriber = namedtuple(
+    'ReplaySubscriber', ['chat_id', 'token', 'digest', 'key']
+)
+
+
+class ReplayBot:
+    """Бот, воспроизводящий записанные исходы отправки."""
+
+    def __init__(self, outcomes, clock):
+        self.outcomes = iter(outcomes)
+        self.clock = clock
+        self.sent = []
+        self.failed = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Повторяет следующий записанный исход отправки."""
+        outcome = next(self.outcomes, {'ok': True})
+        self.clock.advance(outcome.get('duration', 0))
+        if not outcome['ok']:
+            self.failed += 1
+            raise telegram.TelegramError(outcome.get('error', 'replay'))
+        self.sent.append((self.clock.now, chat_id, text))
+
+
+class TraceFetcher:
+    """Отдаёт подписчику последний записанный к текущему моменту ответ."""
+
+    def __init__(self, streams, clock):
+        self.streams = streams
+        self.times = {
+            key: [event['t'] for event in stream]
+            for key, stream in streams.items()
+        }
+        self.clock = clock
+
+    def __call__(self, subscriber, current_timestamp):
+        """Повторяет ответ API так, как его увидел бы опрос."""
+        index = bisect.bisect_right(
+            self.times[subscriber.key], self.clock.now
+        ) - 1
+        if index < 0:
+            return {'homeworks': [], 'current_date': current_timestamp}
+        event = self.streams[subscriber.key][index]
+        self.clock.advance(event.get('duration', 0))
+        if 'error' in event:
+            raise ConnectionError(event['error'])
+        return event['response']
+
+
+def first_seen(streams):
+    """Находит момент первого появления каждого статуса в трассе.
+
+    Ключ - пара (чат, текст сообщения о статусе).
+    """
+    seen = {}
+    for key, stream in streams.items():
+        chat_id = key.split(':')[0]
+        for event in stream:
+            for item in event.get('response', {}).get('homeworks') or []:
+                try:
+                    message = homework.parse_status(item)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                seen.setdefault((chat_id, message), event['t'])
+    return seen
+
+
+def replay(events, retry_time=homework.RETRY_TIME, digest_mode=False):
+    """Прогоняет трассу через цикл опроса в виртуальном времени.
+
+    Каждого записанного подписчика опрашивают раз в `retry_time`
+    виртуальных секунд, и опрос видит последний записанный к этому
+    моменту ответ API. Очередь отправляется до начала следующего
+    опроса, как в main(). `digest_mode` включает сводки всем подписчикам.
+    """
+    streams = {}
+    for event in events:
+        if event['kind'] == 'api':
+            streams.setdefault(event.get('sub', ''), []).append(event)
+    if not streams:
+        raise ValueError('В трассе нет ответов API')
+    start = min(stream[0]['t'] for stream in streams.values())
+    end = max(stream[-1]['t'] for stream in streams.values())
+    clock = VirtualClock(start)
+    bot = ReplayBot(
+        [event for event in events if event['kind'] == 'send'], clock
+    )
+    fetch = TraceFetcher(streams, clock)
+    outbox = Outbox(clock=lambda: clock.now, sleep=clock.advance)
+    digest = DigestBuffer(homework.DIGEST_INTERVAL, homework.DIGEST_MAX_SIZE,
+                          clock=lambda: clock.now)
+    send = partial(homework.deliver, bot)
+    subscribers = [
+        ReplaySubscriber(key.split(':')[0], None, digest_mode, key)
+        for key in streams
+    ]
+    store = CursorStore(start=0)
+    seen = first_seen(streams)
+    polls = 0
+    latencies = []
+    started = time.perf_counter()
+    while clock.now <= end:
+        until = clock.now + retry_time
+        delivered = len(bot.sent)
+        for subscriber in subscribers:
+            homework.poll_subscriber(fetch, outbox, digest, subscriber, store)
+            polls += 1
+        for chat_id, text, acks in digest.due():
+            outbox.put(DIGEST, chat_id, text, acks)
+        homework.flush_outbox(outbox, store, send, until)
+        for sent_at, chat_id, text in bot.sent[delivered:]:
+            latencies.extend(
+                sent_at - seen[(chat_id, line)]
+                for line in text.splitlines() if (chat_id, line) in seen
+            )
+        clock.advance(max(0, until - clock.now))
+    return ReplayReport(
+        polls=polls,
+        sent=len(bot.sent),
+        failed=bot.failed,
+        virtual_seconds=clock.now - start,
+        wall_seconds=time.perf_counter() - started,
+        latencies=latencies,
+    )
+
+
+def summarize(report):
+    """Считает пропускную способность и распределение задержек."""
+    summary = {
+        'polls': report.polls,
+        'sent': report.sent,
+        'failed': report.failed,
+        'polls_per_second': report.polls / max(report.wall_seconds, 1e-9),
+        'speedup': report.virtual_seconds / max(report.wall_seconds, 1e-9),
+    }
+    latencies = sorted(report.latencies)
+    if len(latencies) > 1:
+        p50, p90, p99 = (
+            statistics.quantiles(latencies, n=100)[index]
+            for index in (49, 89, 98)
+        )
+        summary.update(p50=p50, p90=p90, p99=p99, max=latencies[-1])
+    elif latencies:
+        summary.update(p50=latencies[0], p90=latencies[0],
+                       p99=latencies[0], max=latencies[0])
+    return summary
+
+
+def main():
+    """Воспроизводит трассу и печатает отчёт."""
+    parser = argparse.ArgumentParser(
+        description='Воспроизведение записанной трассы бота'
+    )
+    parser.add_argument('trace', help='файл трассы (TRACE_FILE)')
+    parser.add_argument('--retry-time', type=float,
+                        default=homework.RETRY_TIME,
+                        help='интервал опроса в секундах')
+    parser.add_argument('--digest', action='store_true',
+                        help='включить режим сводки всем подписчикам')
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    summary = summarize(
+        replay(read_trace(args.trace), args.retry_time, args.digest)
+    )
+    for key, value in summary.items():
+        print(f'{key}: {value:.3f}' if isinstance(value, float)
+              else f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import hashlib
+import json
+from collections import namedtuple
+
+
+class Subscriber(namedtuple(
+    'Subscriber', ['chat_id', 'token', 'digest', 'bot'], defaults=(None,)
+)):
+    """Чат Telegram, следящий за работами по токену Практикума.
+
+    `bot` - номер бота, который пишет в чат, None - основной бот.
+    """
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Устойчивый идентификатор подписчика без самого токена."""
+        digest = hashlib.sha256(str(self.token).encode()).hexdigest()
+        return f'{self.chat_id}:{digest[:8]}'
+
+
+def load_subscribers(path, chat_id, token, digest=False):
+    """Читает подписчиков из JSON-файла.
+
+    Без файла возвращает единственного подписчика из переменных
+    окружения. Файл содержит список объектов с ключами `chat_id`,
+    `token` и необязательными `digest` и `bot` (номер бота из его
+    токена, часть до двоеточия).
+    """
+    if not path:
+        return [Subscriber(str(chat_id), token, digest)]
+    with open(path, encoding='utf-8') as file:
+        items = json.load(file)
+    return [
+        Subscriber(str(item['chat_id']), item['token'],
+                   bool(item.get('digest', False)),
+                   str(item['bot']) if item.get('bot') else None)
+        for item in items
+    ]
+
+
+def bot_routes(subscribers):
+    """Собирает закрепление чатов за ботами из подписчиков."""
+    routes = {}
+    for subscriber in subscribers:
+        if subscriber.bot is None:
+            continue
+        if routes.setdefault(subscriber.chat_id,
+                             subscriber.bot) != subscriber.bot:
+            raise ValueError(
+                f'Чат {subscriber.chat_id} закреплён за разными ботами'
+            )
+    return routes
@@ -0,0 +1,152 @@
+import threading
+
+
+class TestBackfill:
+
+    def test_cursor_store_persists(self, tmp_path):
+        from cursors import CursorStore
+
+        path = tmp_path / 'state.json'
+        store = CursorStore(path, start=10)
+        assert store.cursor('a') == 10, (
+            'Проверьте, что новый подписчик начинает с момента запуска'
+        )
+        store.advance('a', 20)
+        store.known('a')['hw'] = 'approved'
+        store.save()
+        restored = CursorStore(path, start=99)
+        assert restored.cursor('a') == 20, (
+            'Проверьте, что курсор переживает перезапуск'
+        )
+        assert restored.known('a') == {'hw': 'approved'}
+
+    def test_known_status_not_resent(self):
+        import homework
+        from cursors import CursorStore
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        subscriber = Subscriber('1', 't', False)
+        store = CursorStore(start=0)
+        outbox = Outbox()
+
+        def fetch(subscriber, current_timestamp):
+            return {
+                'homeworks': [
+                    {'homework_name': 'hw2', 'status': 'reviewing'},
+                    {'homework_name': 'hw1', 'status': 'approved'},
+                ],
+                'current_date': 100,
+            }
+
+        for _ in range(2):
+            homework.poll_subscriber(
+                fetch, outbox, DigestBuffer(), subscriber, store
+            )
+        assert len(outbox) == 2, (
+            'Проверьте, что статусы в очереди не ставятся повторно'
+        )
+        assert store.cursor(subscriber.key) == 0, (
+            'Курсор не должен сдвигаться до доставки статусов'
+        )
+        homework.flush_outbox(outbox, store, lambda chat_id, text: True)
+        assert store.cursor(subscriber.key) == 100
+        homework.poll_subscriber(
+            fetch, outbox, DigestBuffer(), subscriber, store
+        )
+        assert len(outbox) == 0, (
+            'Проверьте, что известные статусы не отправляются повторно'
+        )
+
+    def test_restart_before_delivery(self, tmp_path):
+        import homework
+        from cursors import CursorStore
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        path = tmp_path / 'state.json'
+        subscriber = Subscriber('1', 't', False)
+
+        def fetch(subscriber, current_timestamp):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 100,
+            }
+
+        def cycle(send):
+            store = CursorStore(path, start=0)
+            outbox = Outbox()
+            homework.poll_subscriber(
+                fetch, outbox, DigestBuffer(), subscriber, store
+            )
+            store.save()
+            queued = len(outbox)
+            homework.flush_outbox(outbox, store, send)
+            return queued
+
+        assert cycle(lambda chat_id, text: False) == 1
+        assert cycle(lambda chat_id, text: True) == 1, (
+            'Проверьте, что недоставленный статус отправляется '
+            'после перезапуска'
+        )
+        assert cycle(lambda chat_id, text: True) == 0, (
+            'Проверьте, что доставленный статус не отправляется повторно'
+        )
+        assert CursorStore(path).cursor(subscriber.key) == 100
+
+    def test_catch_up(self):
+        import homework
+        from backfill import catch_up
+        from cursors import CursorStore
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        subscribers = [Subscriber(str(chat), 't', False) for chat in range(5)]
+        store = CursorStore(start=0)
+        store.advance(subscribers[0].key, 990)
+        outbox = Outbox()
+        requested = []
+        threads = set()
+        flushes = []
+        beats = []
+
+        def fetch(subscriber, current_timestamp):
+            requested.append(current_timestamp)
+            threads.add(threading.get_ident())
+            if subscriber.chat_id == '4':
+                raise ConnectionError('нет связи')
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1000,
+            }
+
+        count = catch_up(
+            subscribers, store, fetch,
+            lambda fetch, subscriber: homework.poll_subscriber(
+                fetch, outbox, DigestBuffer(), subscriber, store
+            ),
+            lambda: flushes.append(homework.flush_outbox(
+                outbox, store, lambda chat_id, text: True
+            )),
+            lag=60, max_age=500, workers=2, batch_size=2,
+            clock=lambda: 1000, beat=lambda: beats.append(1),
+        )
+        assert count == 4, (
+            'Проверьте, что догоняются только отставшие подписчики'
+        )
+        assert requested == [500] * 4, (
+            'Проверьте, что курсор не уходит в прошлое дальше max_age'
+        )
+        assert len(threads) <= 2 and len(flushes) == 2, (
+            'Проверьте ограничение параллельности и размер пачки'
+        )
+        assert store.cursor(subscribers[4].key) == 500, (
+            'Курсор подписчика с ошибкой не должен сдвигаться'
+        )
+        assert store.cursor(subscribers[1].key) == 1000
+        assert len(beats) == 8, (
+            'Проверьте, что догон отмечает прогресс по каждому подписчику'
+        )
@@ -0,0 +1,141 @@
+import telegram
+
+
+class MockBot:
+
+    def __init__(self, token=None, request=None, **kwargs):
+        self.token = token
+        self.request = request
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if text == 'ошибка':
+            raise telegram.TelegramError(text)
+        self.sent.append((chat_id, text))
+        return text
+
+
+class TestDelivery:
+
+    def test_pool_request_settings(self, monkeypatch):
+        monkeypatch.setattr(telegram, 'Bot', MockBot)
+        from delivery import BotPool
+
+        pool = BotPool(
+            ['1:a'], pool_size=3, connect_timeout=1.5, read_timeout=7
+        )
+        request = pool.bots[0].request
+        assert request._connect_timeout == 1.5, (
+            'Проверьте, что таймауты соединения настраиваются'
+        )
+        assert request.con_pool_size == 3, (
+            'Проверьте, что размер пула соединений настраивается'
+        )
+
+    def test_chat_routes(self, monkeypatch):
+        monkeypatch.setattr(telegram, 'Bot', MockBot)
+        from delivery import BotPool
+
+        pool = BotPool(['1:a', '2:b', '3:c'], routes={'42': '3'})
+        for chat_id in (12345, 67890, 42):
+            pool.send_message(chat_id, text='привет')
+        assert [len(bot.sent) for bot in pool.bots] == [2, 0, 1], (
+            'Проверьте, что чат без маршрута обслуживает основной бот, '
+            'а закреплённый чат - свой бот'
+        )
+
+    def test_unknown_route(self, monkeypatch):
+        monkeypatch.setattr(telegram, 'Bot', MockBot)
+        from delivery import BotPool
+
+        try:
+            BotPool(['1:a'], routes={'42': '2'})
+        except ValueError:
+            pass
+        else:
+            assert False, 'Маршрут к неизвестному боту должен давать ошибку'
+
+    def test_bot_routes(self):
+        from subscribers import Subscriber, bot_routes
+
+        assert bot_routes([
+            Subscriber('1', 'a', False), Subscriber('2', 'b', False, '7')
+        ]) == {'2': '7'}, 'Проверьте сбор маршрутов из подписчиков'
+        try:
+            bot_routes([
+                Subscriber('2', 'a', False, '7'),
+                Subscriber('2', 'b', False, '8'),
+            ])
+        except ValueError:
+            pass
+        else:
+            assert False, 'Чат не может быть закреплён за разными ботами'
+
+    def test_stats(self, monkeypatch):
+        monkeypatch.setattr(telegram, 'Bot', MockBot)
+        from delivery import BotPool
+
+        pool = BotPool(['1:a'])
+        pool.send_message(1, text='привет')
+        try:
+            pool.send_message(1, text='ошибка')
+        except telegram.TelegramError:
+            pass
+        else:
+            assert False, 'Ошибка отправки должна пробрасываться'
+        stats = pool.stats.snapshot()
+        assert stats['count'] == 2 and stats['errors'] == 1, (
+            'Проверьте подсчёт отправок и ошибок'
+        )
+        assert 'send_p95' in stats
+
+    def test_pool_wait(self, monkeypatch):
+        import threading
+
+        monkeypatch.setattr(telegram, 'Bot', MockBot)
+        from delivery import BotPool
+
+        pool = BotPool(['1:a'], pool_size=1)
+        release = threading.Event()
+        sending = threading.Event()
+
+        def slow_send(chat_id=None, text=None, **kwargs):
+            sending.set()
+            release.wait(5)
+
+        pool.bots[0].send_message = slow_send
+        thread = threading.Thread(
+            target=pool.send_message, args=(1,), kwargs={'text': 'первое'}
+        )
+        thread.start()
+        sending.wait(5)
+        threading.Timer(0.05, release.set).start()
+        pool.send_message(2, text='второе')
+        thread.join()
+        stats = pool.stats.snapshot()
+        assert stats['wait_max'] >= 0.04, (
+            'Проверьте, что ожидание свободного соединения попадает '
+            'в статистику'
+        )
+
+    def test_stats_window(self):
+        from delivery import DeliveryStats
+
+        stats = DeliveryStats(window=3)
+        stats.add(0.1, ok=False)
+        for _ in range(3):
+            stats.add(0.2)
+        snapshot = stats.snapshot()
+        assert snapshot['count'] == 3 and snapshot['errors'] == 0, (
+            'Проверьте, что ошибки считаются по тому же окну, что и отправки'
+        )
+
+    def test_no_tokens(self):
+        from delivery import BotPool
+
+        try:
+            BotPool([])
+        except ValueError:
+            pass
+        else:
+            assert False, 'Пул без токенов должен давать ошибку'
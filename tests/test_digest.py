@@ -0,0 +1,126 @@
+import json
+
+
+class TestDigest:
+
+    def test_digest_by_interval(self, clock):
+        from digest import DigestBuffer
+
+        digest = DigestBuffer(interval=100, max_size=10, clock=clock)
+        digest.add('1', 'hw1', 'Работа hw1 взята на проверку')
+        digest.add('1', 'hw2', 'Работа hw2 взята на проверку')
+        assert digest.due() == [], (
+            'Проверьте, что сводка не отправляется раньше срока'
+        )
+        clock.now = 100
+        [(chat_id, text, _)] = digest.due()
+        assert chat_id == '1' and text.count('\n') == 2, (
+            'Проверьте, что сводка собирает все изменения чата'
+        )
+        assert digest.due() == [], 'Сводка должна очищаться после выпуска'
+
+    def test_digest_by_size_keeps_last_status(self, clock):
+        from digest import DigestBuffer
+
+        digest = DigestBuffer(interval=100, max_size=2, clock=clock)
+        digest.add('1', 'hw1', 'hw1 на проверке')
+        digest.add('1', 'hw1', 'hw1 принята')
+        assert digest.due() == [], (
+            'Проверьте, что повторная смена статуса заменяет прежнюю строку'
+        )
+        digest.add('1', 'hw2', 'hw2 на проверке')
+        [(_, text, _)] = digest.due()
+        assert 'hw1 принята' in text and 'hw1 на проверке' not in text
+
+    def test_digest_discard(self, clock):
+        from digest import DigestBuffer
+
+        digest = DigestBuffer(interval=100, clock=clock)
+        digest.add('1', ('a', 'hw1'), 'hw1 принята', ('a', 'hw1', 'approved'))
+        digest.add('1', ('b', 'hw2'), 'hw2 принята', ('b', 'hw2', 'approved'))
+        digest.add('2', ('a', 'hw3'), 'hw3 принята', ('a', 'hw3', 'approved'))
+        digest.discard({'a'})
+        [(chat_id, _, acks)] = digest.due(force=True)
+        assert chat_id == '1' and acks == [('b', 'hw2', 'approved')], (
+            'Проверьте, что из сводок убираются только статусы '
+            'сменившего владельца подписчика'
+        )
+
+    def test_handle_response_digest(self):
+        import homework
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        outbox = Outbox()
+        digest = DigestBuffer()
+        response = {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}]
+        }
+        homework.handle_response(
+            outbox, digest, Subscriber('1', 't', True), response, {}
+        )
+        homework.handle_response(
+            outbox, digest, Subscriber('2', 't', False), response, {}
+        )
+        assert len(outbox) == 1 and len(digest.due(force=True)) == 1, (
+            'Проверьте, что в режиме сводки статус копится, '
+            'а без него сразу ставится в очередь'
+        )
+
+    def test_digest_known_after_delivery(self, clock, tmp_path):
+        import homework
+        from cursors import CursorStore
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        path = tmp_path / 'state.json'
+        subscriber = Subscriber('1', 't', True)
+
+        def fetch(subscriber, current_timestamp):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 100,
+            }
+
+        def cycle():
+            store = CursorStore(path, start=0)
+            outbox = Outbox()
+            digest = DigestBuffer(interval=100, clock=clock)
+            homework.poll_subscriber(fetch, outbox, digest, subscriber, store)
+            store.save()
+            return store, outbox, digest
+
+        store, _, digest = cycle()
+        assert store.known(subscriber.key) == {}, (
+            'Статус из сводки не должен считаться известным до отправки'
+        )
+        store, outbox, digest = cycle()
+        [(chat_id, text, acks)] = digest.due(force=True)
+        outbox.put('digest', chat_id, text, acks)
+        homework.flush_outbox(outbox, store, lambda chat_id, text: True)
+        assert CursorStore(path).known(subscriber.key) == {
+            'hw': 'approved'
+        }, 'Проверьте, что статусы сводки становятся известными после отправки'
+        assert cycle()[2].due(force=True) == [], (
+            'Доставленная сводка не должна повторяться после перезапуска'
+        )
+
+    def test_load_subscribers(self, tmp_path):
+        from subscribers import load_subscribers
+
+        assert load_subscribers(None, 5, 't') == [('5', 't', False, None)]
+        path = tmp_path / 'subscribers.json'
+        path.write_text(json.dumps([
+            {'chat_id': 1, 'token': 'a', 'digest': True},
+            {'chat_id': 1, 'token': 'b', 'bot': 7},
+        ]))
+        subscribers = load_subscribers(path, 5, 't')
+        assert [subscriber.digest for subscriber in subscribers] == [
+            True, False
+        ]
+        assert [subscriber.bot for subscriber in subscribers] == [None, '7']
+        assert subscribers[0].key != subscribers[1].key, (
+            'Проверьте, что подписчики одного чата различаются по токену'
+        )
@@ -0,0 +1,128 @@
+from http import HTTPStatus
+
+import requests
+
+SECRET = 'secret-practicum-token'
+
+
+class MockResponse:
+
+    def __init__(self, data, status_code=HTTPStatus.OK):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self.data
+
+
+class TestExceptions:
+
+    def test_redact(self):
+        import exceptions
+
+        headers = {'Authorization': f'OAuth {SECRET}', 'Accept': 'json'}
+        assert exceptions.redact(headers) == {
+            'Authorization': 'OAuth ***', 'Accept': 'json'
+        }, 'Проверьте маскировку токена в заголовках'
+        assert headers['Authorization'] == f'OAuth {SECRET}', (
+            'Маскировка не должна менять исходные заголовки'
+        )
+
+    def test_api_errors_hide_token(self, monkeypatch):
+        import exceptions
+        import homework
+
+        headers = {'Authorization': f'OAuth {SECRET}'}
+        cases = [
+            (MockResponse({'code': 'not_authenticated'}),
+             exceptions.ResponseError),
+            (MockResponse({}, HTTPStatus.INTERNAL_SERVER_ERROR),
+             exceptions.StatusCodeError),
+        ]
+        for response, error_class in cases:
+            monkeypatch.setattr(requests, 'get',
+                                lambda *args, **kwargs: response)
+            try:
+                homework.request_statuses(headers, 0)
+            except error_class as error:
+                assert SECRET not in str(error) and SECRET not in repr(error), (
+                    'Убедитесь, что токен не попадает в текст ошибки'
+                )
+                assert error.endpoint == homework.ENDPOINT
+                assert error.params == {'from_date': 0}
+            else:
+                assert False, f'Ожидалась ошибка {error_class.__name__}'
+
+    def test_connection_error(self, monkeypatch):
+        import exceptions
+        import homework
+
+        def mock_get(*args, **kwargs):
+            raise requests.exceptions.ConnectionError('нет связи')
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        try:
+            homework.request_statuses({'Authorization': f'OAuth {SECRET}'}, 0)
+        except exceptions.APIConnectionError as error:
+            assert 'нет связи' in str(error) and SECRET not in str(error)
+        else:
+            assert False, 'Ожидалась ошибка APIConnectionError'
+
+    def test_alert_is_short(self):
+        import exceptions
+        import homework
+        from outbox import Outbox
+
+        outbox = Outbox()
+        for from_date in (1, 2):
+            homework.handle_error(outbox, exceptions.StatusCodeError(
+                homework.ENDPOINT, {'Authorization': f'OAuth {SECRET}'},
+                {'from_date': from_date}, 500
+            ))
+        [message] = outbox.queues['error']
+        assert message.text == (
+            'Проблемы: Ошибка ответа сервера, код возврата 500.'
+        ), 'Проверьте, что одинаковые сбои склеиваются в одно оповещение'
+
+    def test_headers_redacted_once(self, monkeypatch):
+        import exceptions
+        import homework
+
+        calls = []
+        redact = exceptions.redact
+        monkeypatch.setattr(
+            exceptions, 'redact',
+            lambda headers: calls.append(headers) or redact(headers)
+        )
+        headers = homework.subscriber_headers(f'{SECRET}-once')
+        assert headers is homework.subscriber_headers(f'{SECRET}-once'), (
+            'Проверьте, что заголовки подписчика создаются один раз'
+        )
+        for params in ({'from_date': 1}, {'from_date': 2}):
+            error = exceptions.APIConnectionError(
+                homework.ENDPOINT, headers, params, 'нет связи'
+            )
+            assert SECRET not in str(error)
+        assert len(calls) == 1, (
+            'Проверьте, что заголовки маскируются один раз при создании'
+        )
+
+    def test_error_logged_briefly(self, caplog):
+        import exceptions
+        import homework
+        from outbox import Outbox
+
+        class Unrendered(exceptions.APIConnectionError):
+
+            def __str__(self):
+                raise AssertionError('Полный текст ошибки собран без нужды')
+
+        caplog.set_level('ERROR')
+        homework.handle_error(
+            Outbox(), Unrendered(homework.ENDPOINT, {}, {}, 'нет связи'),
+            'chat:key'
+        )
+        assert caplog.messages == [
+            'Сбой в работе телеграмм-бота (chat:key): '
+            'Ошибка доступа нет связи.'
+        ], 'Проверьте, что в лог идёт суть ошибки и ключ подписчика'
@@ -0,0 +1,114 @@
+import json
+import urllib.error
+import urllib.request
+
+
+class TestHealth:
+
+    def test_stalled_operation(self, clock):
+        from health import Watchdog
+
+        watchdog = Watchdog({'api': 10}, default_deadline=100, clock=clock)
+        with watchdog.track('api:1'):
+            clock.now = 5
+            assert watchdog.stalled() == []
+            clock.now = 11
+            assert watchdog.stalled() == ['api:1'], (
+                'Проверьте, что зависший запрос к API обнаруживается'
+            )
+        assert watchdog.stalled() == []
+        clock.now = 20
+        with watchdog.track('api:2'):
+            pass
+        assert watchdog.status()['last_ok_seconds_ago'] == {'api': 0}, (
+            'Проверьте, что в ответ не попадают ключи подписчиков'
+        )
+
+    def test_progress_resets_deadline(self, clock):
+        from health import Watchdog
+
+        watchdog = Watchdog({'loop': 10}, clock=clock)
+        with watchdog.track('loop') as beat:
+            for _ in range(5):
+                clock.now += 8
+                assert watchdog.stalled() == [], (
+                    'Проверьте, что отмеченный прогресс продлевает срок'
+                )
+                beat()
+            clock.now += 11
+            assert watchdog.stalled() == ['loop'], (
+                'Проверьте, что операция без прогресса считается зависшей'
+            )
+
+    def test_wait_not_stalled(self, clock):
+        from health import Watchdog
+
+        watchdog = Watchdog({'flush': 10}, clock=clock)
+        with watchdog.track('flush') as beat:
+            beat(300)
+            clock.now = 305
+            assert watchdog.stalled() == [], (
+                'Проверьте, что ожидание бюджета не считается зависанием'
+            )
+            clock.now = 311
+            assert watchdog.stalled() == ['flush']
+
+    def test_flush_beats_per_batch(self, clock):
+        import homework
+        from cursors import CursorStore
+        from outbox import TRANSITION, Outbox
+
+        outbox = Outbox(
+            budgets={'transition': (1, 2), 'digest': (1, 1),
+                     'error': (1, 1)},
+            clock=clock, sleep=clock.sleep,
+        )
+        for number in range(4):
+            outbox.put(TRANSITION, 1, f'Изменился статус {number}')
+        beats = []
+        homework.flush_outbox(
+            outbox, CursorStore(start=0), lambda chat_id, text: True,
+            until=100, beat=lambda wait=0: beats.append(wait)
+        )
+        assert beats == [0, 0, 1, 0, 1, 0], (
+            'Проверьте, что отправка отмечает прогресс после каждой пачки '
+            'и перед ожиданием бюджета'
+        )
+
+    def test_failed_operation_not_ok(self):
+        from health import Watchdog
+
+        watchdog = Watchdog()
+        try:
+            with watchdog.track('send'):
+                raise ConnectionError
+        except ConnectionError:
+            pass
+        status = watchdog.status()
+        assert status['alive'] and 'send' not in status[
+            'last_ok_seconds_ago'
+        ], 'Проверьте, что неудачная операция не считается успешной'
+
+    def test_endpoints(self):
+        from health import Watchdog, serve
+
+        watchdog = Watchdog()
+        server = serve(watchdog, 0, host='127.0.0.1')
+        url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+        try:
+            with urllib.request.urlopen(url + '/health') as response:
+                assert json.load(response)['alive']
+            try:
+                urllib.request.urlopen(url + '/ready')
+            except urllib.error.HTTPError as error:
+                assert error.code == 503, (
+                    'Проверьте, что бот не готов до первого цикла опроса'
+                )
+            else:
+                assert False, 'Бот не должен быть готов до первого цикла'
+            with watchdog.track('loop'):
+                pass
+            with urllib.request.urlopen(url + '/ready') as response:
+                assert response.status == 200
+        finally:
+            server.shutdown()
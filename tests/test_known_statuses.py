@@ -0,0 +1,48 @@
+class TestKnownStatuses:
+
+    def test_known_status_not_formatted(self, monkeypatch):
+        import homework
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        formatted = []
+        parse_status = homework.parse_status
+        monkeypatch.setattr(
+            homework, 'parse_status',
+            lambda item: formatted.append(item) or parse_status(item)
+        )
+        outbox = Outbox()
+        response = {'homeworks': [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'homework_name': 'hw2', 'status': 'reviewing'},
+        ]}
+        homework.handle_response(
+            outbox, DigestBuffer(), Subscriber('1', 't', False), response,
+            {'hw1': 'approved'}, {}
+        )
+        assert [item['homework_name'] for item in formatted] == ['hw2'], (
+            'Проверьте, что сообщение собирается только для новых статусов'
+        )
+        assert len(outbox) == 1
+
+    def test_malformed_status_reported(self):
+        import homework
+        from cursors import CursorStore
+        from digest import DigestBuffer
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        outbox = Outbox()
+        store = CursorStore(start=0)
+
+        def fetch(subscriber, current_timestamp):
+            return {'homeworks': [{'homework_name': 'hw', 'status': ['x']}]}
+
+        homework.poll_subscriber(
+            fetch, outbox, DigestBuffer(), Subscriber('1', 't', False), store
+        )
+        assert len(outbox.queues['error']) == 1, (
+            'Проверьте, что некорректный статус даёт сообщение об ошибке'
+        )
+        assert store.cursor(Subscriber('1', 't', False).key) == 0
@@ -0,0 +1,229 @@
+class TestLeases:
+
+    def test_single_owner(self, clock, tmp_path):
+        from leases import SQLiteLeases
+
+        path = tmp_path / 'leases.db'
+        first = SQLiteLeases(path, 'first', ttl=30, clock=clock)
+        second = SQLiteLeases(path, 'second', ttl=30, clock=clock)
+        assert first.acquire('a') == 30 and second.acquire('a') is None, (
+            'Проверьте, что аренда принадлежит только одной реплике'
+        )
+        clock.now = 20
+        assert first.acquire('a'), 'Владелец должен продлевать аренду'
+        clock.now = 45
+        assert not second.acquire('a'), (
+            'Продлённая аренда не должна переходить другой реплике'
+        )
+        clock.now = 51
+        assert second.acquire('a'), (
+            'Проверьте, что просроченную аренду забирает другая реплика'
+        )
+        second.release('a')
+        assert first.acquire('a'), (
+            'Проверьте, что отпущенная аренда сразу свободна'
+        )
+
+    def test_coordinator(self, clock, tmp_path):
+        from leases import Coordinator, SQLiteLeases
+        from subscribers import Subscriber
+
+        path = tmp_path / 'leases.db'
+        subscribers = [Subscriber('1', 'a', False), Subscriber('2', 'b', False)]
+        other = SQLiteLeases(path, 'other', ttl=30, clock=clock)
+        other.acquire(subscribers[1].key)
+        coordinator = Coordinator(
+            SQLiteLeases(path, 'me', ttl=30, clock=clock), subscribers
+        )
+        assert coordinator.claim() == 1
+        assert coordinator.owned() == [subscribers[0]], (
+            'Проверьте, что реплика опрашивает только своих подписчиков'
+        )
+        assert coordinator.take_changed() == {subscribers[0].key}
+        clock.now = 31
+        assert coordinator.claim() == 1 and len(coordinator.owned()) == 2, (
+            'Проверьте, что реплика забирает подписчиков упавшей реплики'
+        )
+        coordinator.release()
+        assert other.acquire(subscribers[0].key)
+
+    def test_stalled_replica_yields(self, clock, tmp_path):
+        from leases import Coordinator, SQLiteLeases
+        from subscribers import Subscriber
+
+        path = tmp_path / 'leases.db'
+        alive = [True]
+        subscriber = Subscriber('1', 'a', False)
+        coordinator = Coordinator(
+            SQLiteLeases(path, 'me', ttl=30, clock=clock), [subscriber],
+            alive=lambda: alive[0], margin=5, clock=clock
+        )
+        coordinator.claim()
+        assert not coordinator.holds(subscriber.key), (
+            'Аренда, сменившая владельца, не действует до take_changed'
+        )
+        coordinator.take_changed()
+        assert coordinator.holds(subscriber.key)
+        alive[0] = False
+        clock.now = 26
+        coordinator.claim()
+        assert not coordinator.holds(subscriber.key), (
+            'Проверьте, что аренда без запаса до конца считается потерянной'
+        )
+        clock.now = 31
+        other = SQLiteLeases(path, 'other', ttl=30, clock=clock)
+        assert other.acquire(subscriber.key), (
+            'Проверьте, что зависшая реплика не продлевает аренды'
+        )
+
+    def test_expiring_lease_not_delivered(self, clock, tmp_path):
+        import homework
+        from cursors import CursorStore
+        from leases import Coordinator, SQLiteLeases
+        from outbox import TRANSITION, Outbox
+        from subscribers import Subscriber
+
+        subscriber = Subscriber('1', 'a', False)
+        key = subscriber.key
+        coordinator = Coordinator(
+            SQLiteLeases(tmp_path / 'leases.db', 'me', ttl=30, clock=clock),
+            [subscriber], margin=5, clock=clock
+        )
+        coordinator.claim()
+        store = CursorStore(start=0)
+        store.queued(key)['hw'] = 'approved'
+        store.advance(key, 100)
+        outbox = Outbox()
+        outbox.put(TRANSITION, '1', 'approved', [(key, 'hw', 'approved')])
+        sent = []
+        clock.now = 26
+        homework.flush_outbox(
+            outbox, store, lambda *args: sent.append(args) or True,
+            holds=coordinator.holds
+        )
+        assert sent == [] and len(outbox) == 0, (
+            'Проверьте, что сообщение не отправляется по истекающей аренде'
+        )
+        assert store.queued(key) == {} and store.known(key) == {}, (
+            'Неотправленный статус должен сниматься с очереди'
+        )
+        assert store.cursor(key) == 0, (
+            'Проверьте, что курсор не сдвигается за неотправленный статус'
+        )
+
+    def test_shared_cursor_store(self, tmp_path):
+        from cursors import SQLiteCursorStore
+
+        path = tmp_path / 'leases.db'
+        first = SQLiteCursorStore(path, start=0)
+        second = SQLiteCursorStore(path, start=0)
+        first.advance('a', 10)
+        first.known('a')['hw'] = 'approved'
+        second.advance('b', 20)
+        first.save()
+        second.save()
+        assert second.cursor('a') == 10, (
+            'Проверьте, что реплики видят общее состояние'
+        )
+        first.advance('a', 30)
+        first.save()
+        second.refresh('a')
+        assert second.cursor('a') == 30 and second.known('a') == {
+            'hw': 'approved'
+        }, 'Проверьте, что refresh перечитывает подписчика из базы'
+        assert SQLiteCursorStore(path).cursor('b') == 20, (
+            'Реплика не должна затирать чужих подписчиков'
+        )
+
+    def test_catch_up_then_cycle_sends_once(self, clock, tmp_path):
+        import homework
+        from backfill import catch_up
+        from cursors import SQLiteCursorStore
+        from digest import DigestBuffer
+        from leases import Coordinator, SQLiteLeases
+        from outbox import Outbox
+        from subscribers import Subscriber
+
+        path = tmp_path / 'leases.db'
+        subscriber = Subscriber('1', 'a', False)
+        coordinator = Coordinator(
+            SQLiteLeases(path, 'me', ttl=30, clock=clock), [subscriber],
+            margin=5, clock=clock
+        )
+        store = SQLiteCursorStore(
+            path, start=0, holds=lambda key: coordinator.holds(key, margin=0)
+        )
+        outbox = Outbox(clock=clock, sleep=clock.sleep)
+        digest = DigestBuffer(clock=clock)
+        sent = []
+
+        def fetch(subscriber, current_timestamp):
+            return {
+                'homeworks': [
+                    {'homework_name': f'hw{number}', 'status': 'approved'}
+                    for number in range(40)
+                ],
+                'current_date': 100,
+            }
+
+        def send(chat_id, text):
+            sent.append(text)
+            return True
+
+        def flush():
+            homework.flush_outbox(
+                outbox, store, send, holds=coordinator.holds
+            )
+
+        coordinator.claim()
+        coordinator.take_changed()
+        catch_up(
+            coordinator.owned(), store, fetch,
+            lambda fetch, subscriber: homework.poll_subscriber(
+                fetch, outbox, digest, subscriber, store
+            ),
+            flush, lag=60, clock=lambda: 1000,
+        )
+        assert len(sent) == 30 and len(outbox) == 10
+        coordinator.changed.add(subscriber.key)
+        for _ in range(3):
+            clock.now += 20
+            coordinator.claim()
+            homework.run_cycle(fetch, outbox, digest, store, coordinator)
+            flush()
+        assert len(sent) == len(set(sent)) == 40, (
+            'Проверьте, что после догона и смены владельца '
+            'статусы не отправляются дважды'
+        )
+        assert SQLiteCursorStore(path).cursor(subscriber.key) == 100
+
+    def test_lost_lease_not_saved(self, clock, tmp_path):
+        from cursors import SQLiteCursorStore
+        from leases import Coordinator, SQLiteLeases
+        from subscribers import Subscriber
+
+        path = tmp_path / 'leases.db'
+        subscriber = Subscriber('1', 'a', False)
+        coordinator = Coordinator(
+            SQLiteLeases(path, 'me', ttl=30, clock=clock), [subscriber],
+            clock=clock
+        )
+        coordinator.claim()
+        coordinator.take_changed()
+        store = SQLiteCursorStore(
+            path, holds=lambda key: coordinator.holds(key, margin=0)
+        )
+        store.advance(subscriber.key, 10)
+        store.save()
+        clock.now = 31
+        other = SQLiteLeases(path, 'other', ttl=30, clock=clock)
+        assert other.acquire(subscriber.key)
+        newer = SQLiteCursorStore(path)
+        newer.advance(subscriber.key, 50)
+        newer.save()
+        store.advance(subscriber.key, 20)
+        store.save()
+        assert SQLiteCursorStore(path).cursor(subscriber.key) == 50, (
+            'Проверьте, что реплика без аренды не затирает курсор '
+            'нового владельца'
+        )
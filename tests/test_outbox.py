@@ -0,0 +1,131 @@
+class TestOutbox:
+
+    def make_outbox(self, clock, **kwargs):
+        from outbox import Outbox
+
+        budgets = {
+            'transition': (1, 10), 'digest': (1, 10), 'error': (1, 10)
+        }
+        budgets.update(kwargs.pop('budgets', {}))
+        return Outbox(budgets=budgets, clock=clock, **kwargs)
+
+    def test_transition_before_error(self, clock):
+        from outbox import ERROR, TRANSITION
+
+        outbox = self.make_outbox(clock)
+        outbox.put(ERROR, 1, 'Проблемы: сбой')
+        outbox.put(TRANSITION, 1, 'Изменился статус')
+        sent = []
+        outbox.flush(lambda chat_id, text: sent.append(text) or True)
+        assert sent == ['Изменился статус', 'Проблемы: сбой'], (
+            'Проверьте, что смены статусов отправляются раньше ошибок'
+        )
+
+    def test_error_budget_and_coalescing(self, clock):
+        from outbox import ERROR, TRANSITION
+
+        outbox = self.make_outbox(clock, budgets={'error': (0.001, 1)})
+        for _ in range(3):
+            outbox.put(ERROR, 1, 'Проблемы: сбой')
+        outbox.put(ERROR, 1, 'Проблемы: другой сбой')
+        outbox.put(TRANSITION, 1, 'Изменился статус')
+        delivered = outbox.flush(lambda chat_id, text: True)
+        assert [message.text for message in delivered] == [
+            'Изменился статус', 'Проблемы: сбой'
+        ], 'Проверьте бюджет отправки сообщений об ошибках'
+        assert len(outbox) == 1, (
+            'Проверьте, что одинаковые ошибки в очереди склеиваются'
+        )
+
+    def test_starvation_guard(self, clock):
+        from outbox import ERROR, TRANSITION
+
+        outbox = self.make_outbox(clock, max_wait=60)
+        outbox.put(ERROR, 1, 'Проблемы: сбой')
+        clock.now = 100
+        outbox.put(TRANSITION, 1, 'Изменился статус')
+        delivered = outbox.flush(lambda chat_id, text: True, limit=1)
+        assert delivered[0].kind == ERROR, (
+            'Проверьте, что долго ждущее сообщение отправляется первым'
+        )
+
+    def test_failed_transition_requeued(self, clock):
+        from outbox import ERROR, TRANSITION
+
+        outbox = self.make_outbox(clock)
+        outbox.put(TRANSITION, 1, 'Изменился статус')
+        outbox.put(ERROR, 1, 'Проблемы: сбой')
+        assert outbox.flush(lambda chat_id, text: False) == []
+        assert len(outbox) == 2, (
+            'Проверьте, что неотправленная смена статуса остаётся в очереди'
+        )
+        delivered = outbox.flush(lambda chat_id, text: True)
+        assert [message.kind for message in delivered] == [TRANSITION, ERROR]
+
+    def test_budget_paced_within_cycle(self, clock):
+        from outbox import TRANSITION
+
+        outbox = self.make_outbox(clock, sleep=clock.sleep)
+        for number in range(100):
+            outbox.put(TRANSITION, 1, f'Изменился статус {number}')
+        assert len(outbox.flush(lambda chat_id, text: True)) == 10, (
+            'Без until отправка не должна ждать пополнения бюджета'
+        )
+        cycles = []
+        for cycle in range(1, 3):
+            cycles.append(len(outbox.flush(
+                lambda chat_id, text: True, until=cycle * 60
+            )))
+        assert cycles == [59, 31], (
+            'Проверьте, что за цикл используется весь бюджет отправок'
+        )
+        assert clock.now == 90 and len(outbox) == 0
+
+    def test_parallel_send(self, clock):
+        import threading
+        import time
+
+        from outbox import TRANSITION
+
+        outbox = self.make_outbox(clock, workers=3)
+        for chat_id in (1, 2, 3, 1):
+            outbox.put(TRANSITION, chat_id, f'статус для {chat_id}')
+        lock = threading.Lock()
+        active = []
+        peaks = []
+
+        def send(chat_id, text):
+            with lock:
+                active.append(chat_id)
+                peaks.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(chat_id)
+            return True
+
+        delivered = outbox.flush(send)
+        assert max(peaks) == 3, (
+            'Проверьте, что сообщения в разные чаты отправляются параллельно'
+        )
+        assert [message.chat_id for message in delivered] == [1, 2, 3, 1], (
+            'Сообщения одного чата должны уходить по порядку'
+        )
+
+    def test_slow_sends_stop_at_until(self, clock):
+        from outbox import TRANSITION
+
+        outbox = self.make_outbox(clock, sleep=clock.sleep, budgets={
+            'transition': (0.5, 30)
+        })
+        for number in range(2000):
+            outbox.put(TRANSITION, 1, f'Изменился статус {number}')
+
+        def slow_send(chat_id, text):
+            clock.sleep(2.5)
+            return True
+
+        delivered = outbox.flush(slow_send, until=600)
+        assert clock.now < 600 + 2.5, (
+            'Проверьте, что медленная отправка не выходит за until'
+        )
+        assert len(delivered) == 240 and len(outbox) == 1760
@@ -0,0 +1,129 @@
+import telegram
+
+
+class FakeBot:
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.fail:
+            raise telegram.TelegramError('недоступен')
+
+
+class TestReplay:
+
+    def make_trace(self, path, statuses):
+        from recorder import TraceRecorder, read_trace
+        from subscribers import Subscriber
+
+        subscriber = Subscriber('1', 'token', False)
+        clock = iter(range(0, 100000, 100))
+        recorder = TraceRecorder(
+            path, clock=lambda: next(clock), timer=lambda: 0
+        )
+        for status in statuses:
+            if status is None:
+                def get_api_answer(subscriber, current_timestamp):
+                    raise ConnectionError('нет связи, OAuth secret')
+            else:
+                def get_api_answer(subscriber, current_timestamp,
+                                   status=status):
+                    return {
+                        'homeworks': [
+                            {'homework_name': 'hw', 'status': status}
+                        ],
+                        'current_date': current_timestamp,
+                    }
+            try:
+                recorder.wrap_api(get_api_answer)(subscriber, 0)
+            except ConnectionError:
+                pass
+        recorder.close()
+        return read_trace(path)
+
+    def test_record_trace(self, tmp_path):
+        events = self.make_trace(tmp_path / 'trace.jsonl',
+                                 ['reviewing', None])
+        assert [event['kind'] for event in events] == ['api', 'api'], (
+            'Проверьте, что каждый запрос к API записывается в трассу'
+        )
+        assert 'response' in events[0] and 'error' in events[1], (
+            'Проверьте, что в трассу пишется ответ или ошибка API'
+        )
+        assert events[1]['error'] == 'ConnectionError', (
+            'Проверьте, что текст ошибки API не попадает в трассу'
+        )
+
+    def test_record_duration(self, tmp_path):
+        from recorder import TraceRecorder, read_trace
+
+        ticks = iter([10, 12.5])
+        recorder = TraceRecorder(
+            tmp_path / 'trace.jsonl', timer=lambda: next(ticks)
+        )
+        recorder.wrap_bot(FakeBot()).send_message(1, text='ok')
+        recorder.close()
+        [event] = read_trace(tmp_path / 'trace.jsonl')
+        assert event['duration'] == 2.5, (
+            'Проверьте, что длительность измеряется часами timer'
+        )
+
+    def test_record_send_outcome(self, tmp_path):
+        from recorder import TraceRecorder, read_trace
+
+        recorder = TraceRecorder(tmp_path / 'trace.jsonl')
+        recorder.wrap_bot(FakeBot()).send_message(1, text='ok')
+        try:
+            recorder.wrap_bot(FakeBot(fail=True)).send_message(1, text='no')
+        except telegram.TelegramError:
+            pass
+        recorder.close()
+        outcomes = [event['ok'] for event in read_trace(
+            tmp_path / 'trace.jsonl'
+        )]
+        assert outcomes == [True, False], (
+            'Проверьте, что в трассу пишется исход каждой отправки'
+        )
+
+    def test_replay_latency(self, tmp_path):
+        import replay
+
+        events = self.make_trace(
+            tmp_path / 'trace.jsonl',
+            ['reviewing', 'reviewing', 'approved', None, 'approved']
+        )
+        report = replay.replay(events, retry_time=120)
+        assert report.polls == 4, (
+            'Проверьте, что опрос идёт с заданным виртуальным интервалом'
+        )
+        assert report.sent == 3, (
+            'Проверьте, что при воспроизведении отправляются '
+            'изменившиеся статусы и сообщения об ошибках'
+        )
+        assert report.latencies == [0, 40], (
+            'Проверьте расчёт задержки уведомления'
+        )
+        summary = replay.summarize(report)
+        assert summary['max'] == 40
+
+    def test_replay_digest(self, tmp_path):
+        import replay
+
+        events = self.make_trace(
+            tmp_path / 'trace.jsonl', ['reviewing', 'approved', 'approved']
+        )
+        report = replay.replay(events, retry_time=100, digest_mode=True)
+        assert report.sent == 0, (
+            'Проверьте, что в режиме сводки статусы не отправляются сразу'
+        )
+
+    def test_replay_empty_trace(self):
+        import replay
+
+        try:
+            replay.replay([])
+        except ValueError:
+            pass
+        else:
+            assert False, 'Трасса без ответов API должна давать ошибку'